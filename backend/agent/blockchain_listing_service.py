@@ -5,9 +5,12 @@ Works with existing database schema using listing_metadata field
 """
 import logging
 import uuid
+from datetime import datetime
 from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select, update, cast, func, text, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 
 # Import models
 try:
@@ -20,6 +23,16 @@ except ImportError:
     except ImportError:
         pass
 
+# Separate guard so a writer import failure cannot leave the models undefined;
+# without the writer, history rows go through the request session
+try:
+    from agent.transaction_history_writer import transaction_history_writer
+except ImportError:
+    try:
+        from backend.agent.transaction_history_writer import transaction_history_writer
+    except ImportError:
+        transaction_history_writer = None
+
 logger = logging.getLogger(__name__)
 
 class BlockchainListingService:
@@ -27,29 +40,101 @@ class BlockchainListingService:
     
     def __init__(self, db: Session):
         self.db = db
+        self._deferred_transactions = []
+        self._writer_hooks_registered = False
 
-    def _resolve_nft_uuid(self, identifier: str) -> uuid.UUID:
+    def _record_transaction(self, **fields) -> uuid.UUID:
         """
-        Resolve an NFT identifier to a UUID primary key.
+        Record a transaction_history row for the current unit of work.
+        When the batched writer is running the row is handed to it once this
+        session commits (so the listing it references is visible and a rolled
+        back request records nothing); otherwise it is added to this session.
+        Returns the id assigned to the row.
+        """
+        row = {
+            'id': uuid.uuid4(),
+            'status': 'completed',
+            'created_at': datetime.utcnow(),
+            **fields
+        }
+
+        if transaction_history_writer is None or not transaction_history_writer.is_running:
+            self.db.add(TransactionHistory(**row))
+            return row['id']
+
+        if not self._writer_hooks_registered:
+            event.listen(self.db, "after_commit", self._publish_deferred_transactions)
+            event.listen(self.db, "after_soft_rollback", self._discard_deferred_transactions)
+            self._writer_hooks_registered = True
+        self._deferred_transactions.append(row)
+        return row['id']
+
+    def _publish_deferred_transactions(self, session):
+        """after_commit hook: hand committed transaction rows to the batched writer"""
+        for row in self._deferred_transactions:
+            transaction_history_writer.submit(row)
+        self._deferred_transactions = []
+
+    def _discard_deferred_transactions(self, session, previous_transaction):
+        """after_soft_rollback hook: drop rows whose unit of work was rolled back"""
+        self._deferred_transactions = []
+
+    def _resolve_nft(self, identifier: str, with_listings: bool = True) -> "NFT":
+        """
+        Resolve an NFT identifier to its NFT row.
         Accepts either a UUID string (database id) or a Sui object id string (sui_object_id).
-        Returns the UUID of the NFT if found, raises ValueError otherwise.
+        Returns the NFT instance (with active_listings eagerly loaded unless
+        with_listings is False) if found, raises ValueError otherwise.
         """
+        stmt = select(NFT)
+        if with_listings:
+            stmt = stmt.options(selectinload(NFT.active_listings))
+
         # Try parse as UUID first
         try:
             nft_uuid = uuid.UUID(str(identifier))
-            # Verify it exists
-            nft = self.db.query(NFT).filter(NFT.id == nft_uuid).first()
+            nft = self.db.execute(stmt.where(NFT.id == nft_uuid)).scalar_one_or_none()
             if nft:
-                return nft.id
+                return nft
         except Exception:
             pass
 
         # Fallback: treat as Sui object id
-        nft = self.db.query(NFT).filter(NFT.sui_object_id == identifier).first()
+        nft = self.db.execute(stmt.where(NFT.sui_object_id == identifier)).scalar_one_or_none()
         if nft:
-            return nft.id
+            return nft
 
         raise ValueError(f"NFT not found for identifier: {identifier}")
+
+    def _transition_active_listing(
+        self,
+        nft_id: uuid.UUID,
+        seller_wallet_address: str,
+        values: Dict[str, Any],
+        metadata_patch: Dict[str, Any],
+        returning: tuple,
+        metadata_expr=None
+    ):
+        """
+        Apply a state change to the seller's active listing in a single UPDATE ... WHERE.
+        listing_metadata is merged server-side with the JSONB || operator; metadata_expr
+        is an optional SQL jsonb expression merged on top (evaluated against the old row).
+        Returns the RETURNING row, or None when no active listing matched.
+        """
+        merged_metadata = Listing.listing_metadata.op('||')(cast(metadata_patch, JSONB))
+        if metadata_expr is not None:
+            merged_metadata = merged_metadata.op('||')(metadata_expr)
+        stmt = (
+            update(Listing)
+            .where(
+                Listing.nft_id == nft_id,
+                Listing.seller_wallet_address == seller_wallet_address,
+                Listing.status == 'active'
+            )
+            .values(listing_metadata=merged_metadata, **values)
+            .returning(*returning)
+        )
+        return self.db.execute(stmt).first()
     
     async def create_listing_with_blockchain(
         self,
@@ -64,81 +149,13 @@ class BlockchainListingService:
         Uses existing listing_metadata field to store blockchain data
         """
         try:
-            # Resolve identifier and fetch NFT
-            resolved_nft_id = self._resolve_nft_uuid(nft_id)
-            nft = self.db.query(NFT).filter(NFT.id == resolved_nft_id).first()
+            # Resolve identifier to the NFT row
+            nft = self._resolve_nft(nft_id, with_listings=False)
+            resolved_nft_id = nft.id
 
             if nft.owner_wallet_address != seller_wallet_address:
                 raise ValueError(f"NFT is not owned by seller {seller_wallet_address}")
 
-            # Check if NFT is already listed
-            existing_listing = self.db.query(Listing).filter(
-                and_(
-                    Listing.nft_id == resolved_nft_id,
-                    Listing.status == 'active'
-                )
-            ).first()
-
-            # If a listing already exists (DB-first flow), update its metadata instead of erroring
-            if existing_listing:
-                logger.info(
-                    f"Active listing already exists for NFT {nft_id} ({existing_listing.id}). "
-                    "Updating listing_metadata with blockchain data."
-                )
-
-                # Ensure metadata dict exists and merge
-                existing_listing.listing_metadata = existing_listing.listing_metadata or {}
-                existing_listing.listing_metadata.update({
-                    'blockchain_tx_id': blockchain_tx_id,
-                    'marketplace_object_id': marketplace_object_id,
-                    'listing_type': 'escrow',
-                    'blockchain_status': 'active',
-                    'created_via': 'blockchain_transaction'
-                })
-
-                # Optionally sync price from blockchain payload if provided
-                if price is not None:
-                    try:
-                        existing_price = float(existing_listing.price) if existing_listing.price is not None else None
-                    except Exception:
-                        existing_price = None
-                    if existing_price != price:
-                        existing_listing.price = price
-
-                # Keep NFT marked as listed
-                nft.is_listed = True
-
-                # Record transaction history for the listing confirmation (idempotent safe)
-                transaction = TransactionHistory(
-                    nft_id=resolved_nft_id,
-                    listing_id=existing_listing.id,
-                    seller_wallet_address=seller_wallet_address,
-                    buyer_wallet_address=seller_wallet_address,  # Same as seller for listing
-                    price=existing_listing.price,
-                    transaction_type='listing',
-                    blockchain_tx_id=blockchain_tx_id,
-                    status='completed'
-                )
-
-                self.db.add(transaction)
-                self.db.commit()
-                self.db.refresh(existing_listing)
-
-                logger.info(
-                    f"Updated existing listing {existing_listing.id} with blockchain data for NFT {nft_id}"
-                )
-
-                return {
-                    'success': True,
-                    'listing_id': str(existing_listing.id),
-                    'nft_id': str(resolved_nft_id),
-                    'seller_wallet_address': seller_wallet_address,
-                    'price': float(existing_listing.price) if existing_listing.price is not None else price,
-                    'status': existing_listing.status,
-                    'blockchain_tx_id': blockchain_tx_id,
-                    'marketplace_object_id': marketplace_object_id
-                }
-
             # Create blockchain metadata
             blockchain_metadata = {
                 'blockchain_tx_id': blockchain_tx_id,
@@ -148,53 +165,68 @@ class BlockchainListingService:
                 'created_via': 'blockchain_transaction'
             }
 
-            # Create new listing
-            listing = Listing(
+            # Upsert against the one-active-listing-per-NFT partial unique index.
+            # If a listing already exists (DB-first flow) its metadata is merged and its
+            # price synced instead of erroring; xmax = 0 only for freshly inserted rows.
+            insert_stmt = pg_insert(Listing).values(
                 nft_id=resolved_nft_id,
                 seller_wallet_address=seller_wallet_address,
                 price=price,
                 status='active',
                 listing_metadata=blockchain_metadata
             )
-
-            self.db.add(listing)
-            # Ensure listing.id is available for transaction_history FK
-            self.db.flush()
+            upsert_stmt = insert_stmt.on_conflict_do_update(
+                index_elements=[Listing.nft_id],
+                index_where=text("status = 'active'"),
+                set_={
+                    'listing_metadata': Listing.listing_metadata.op('||')(
+                        insert_stmt.excluded.listing_metadata
+                    ),
+                    'price': insert_stmt.excluded.price
+                }
+            ).returning(
+                Listing.id,
+                Listing.price,
+                Listing.status,
+                literal_column("(xmax = 0)").label('inserted')
+            )
+            listing = self.db.execute(upsert_stmt).one()
 
             # Update NFT status
             nft.is_listed = True
 
             # Create transaction history
-            transaction = TransactionHistory(
+            self._record_transaction(
                 nft_id=resolved_nft_id,
                 listing_id=listing.id,
                 seller_wallet_address=seller_wallet_address,
                 buyer_wallet_address=seller_wallet_address,  # Same as seller for listing
-                price=price,
+                price=listing.price,
                 transaction_type='listing',
-                blockchain_tx_id=blockchain_tx_id,
-                status='completed'
+                blockchain_tx_id=blockchain_tx_id
             )
 
-            self.db.add(transaction)
-            self.db.commit()
-            self.db.refresh(listing)
+            self.db.flush()
 
-            logger.info(f"Successfully created blockchain listing {listing.id} for NFT {nft_id}")
+            if listing.inserted:
+                logger.info(f"Successfully created blockchain listing {listing.id} for NFT {nft_id}")
+            else:
+                logger.info(
+                    f"Updated existing listing {listing.id} with blockchain data for NFT {nft_id}"
+                )
 
             return {
                 'success': True,
                 'listing_id': str(listing.id),
                 'nft_id': str(resolved_nft_id),
                 'seller_wallet_address': seller_wallet_address,
-                'price': price,
-                'status': 'active',
+                'price': float(listing.price),
+                'status': listing.status,
                 'blockchain_tx_id': blockchain_tx_id,
                 'marketplace_object_id': marketplace_object_id
             }
             
         except Exception as e:
-            self.db.rollback()
             logger.error(f"Error creating blockchain listing: {e}")
             raise
     
@@ -212,37 +244,30 @@ class BlockchainListingService:
         Complete a purchase in the database after successful blockchain transaction
         """
         try:
-            # Resolve identifier and find the active listing
-            resolved_nft_id = self._resolve_nft_uuid(nft_id)
-            listing = self.db.query(Listing).filter(
-                and_(
-                    Listing.nft_id == resolved_nft_id,
-                    Listing.seller_wallet_address == seller_wallet_address,
-                    Listing.status == 'active'
-                )
-            ).first()
+            # Resolve identifier, then mark the active listing sold in one statement
+            nft = self._resolve_nft(nft_id, with_listings=False)
+            resolved_nft_id = nft.id
+            listing = self._transition_active_listing(
+                resolved_nft_id,
+                seller_wallet_address,
+                {'status': 'sold'},
+                {
+                    'purchase_tx_id': blockchain_tx_id,
+                    'blockchain_status': 'sold',
+                    'buyer_wallet_address': buyer_wallet_address
+                },
+                (Listing.id,)
+            )
             
             if not listing:
                 raise ValueError(f"No active listing found for NFT {nft_id}")
             
-            # Get the NFT
-            nft = self.db.query(NFT).filter(NFT.id == resolved_nft_id).first()
-            if not nft:
-                raise ValueError(f"NFT with id {nft_id} not found")
-            
-            # Update listing status and metadata
-            listing.status = 'sold'
-            if listing.listing_metadata:
-                listing.listing_metadata['purchase_tx_id'] = blockchain_tx_id
-                listing.listing_metadata['blockchain_status'] = 'sold'
-                listing.listing_metadata['buyer_wallet_address'] = buyer_wallet_address
-            
             # Update NFT ownership and listing status
             nft.owner_wallet_address = buyer_wallet_address
             nft.is_listed = False
             
             # Create transaction history
-            transaction = TransactionHistory(
+            transaction_id = self._record_transaction(
                 nft_id=resolved_nft_id,
                 listing_id=listing.id,
                 seller_wallet_address=seller_wallet_address,
@@ -250,19 +275,16 @@ class BlockchainListingService:
                 price=price,
                 transaction_type='purchase',
                 blockchain_tx_id=blockchain_tx_id,
-                gas_fee=gas_fee,
-                status='completed'
+                gas_fee=gas_fee
             )
             
-            self.db.add(transaction)
-            self.db.commit()
-            self.db.refresh(transaction)
+            self.db.flush()
             
             logger.info(f"Successfully completed purchase of NFT {nft_id} by {buyer_wallet_address}")
             
             return {
                 'success': True,
-                'transaction_id': str(transaction.id),
+                'transaction_id': str(transaction_id),
                 'nft_id': str(resolved_nft_id),
                 'buyer_wallet_address': buyer_wallet_address,
                 'seller_wallet_address': seller_wallet_address,
@@ -273,7 +295,6 @@ class BlockchainListingService:
             }
             
         except Exception as e:
-            self.db.rollback()
             logger.error(f"Error completing blockchain purchase: {e}")
             raise
     
@@ -287,48 +308,38 @@ class BlockchainListingService:
         Cancel a listing in the database after successful blockchain transaction
         """
         try:
-            # Resolve identifier and find the active listing
-            resolved_nft_id = self._resolve_nft_uuid(nft_id)
-            listing = self.db.query(Listing).filter(
-                and_(
-                    Listing.nft_id == resolved_nft_id,
-                    Listing.seller_wallet_address == seller_wallet_address,
-                    Listing.status == 'active'
-                )
-            ).first()
+            # Resolve identifier, then cancel the active listing in one statement
+            nft = self._resolve_nft(nft_id, with_listings=False)
+            resolved_nft_id = nft.id
+            listing = self._transition_active_listing(
+                resolved_nft_id,
+                seller_wallet_address,
+                {'status': 'cancelled'},
+                {
+                    'unlist_tx_id': blockchain_tx_id,
+                    'blockchain_status': 'cancelled'
+                },
+                (Listing.id, Listing.price)
+            )
             
             if not listing:
                 raise ValueError(f"No active listing found for NFT {nft_id}")
             
-            # Get the NFT
-            nft = self.db.query(NFT).filter(NFT.id == resolved_nft_id).first()
-            if not nft:
-                raise ValueError(f"NFT with id {nft_id} not found")
-            
-            # Update listing status and metadata
-            listing.status = 'cancelled'
-            if listing.listing_metadata:
-                listing.listing_metadata['unlist_tx_id'] = blockchain_tx_id
-                listing.listing_metadata['blockchain_status'] = 'cancelled'
-            
             # Update NFT listing status
             nft.is_listed = False
             
             # Create transaction history
-            transaction = TransactionHistory(
+            self._record_transaction(
                 nft_id=resolved_nft_id,
                 listing_id=listing.id,
                 seller_wallet_address=seller_wallet_address,
                 buyer_wallet_address=seller_wallet_address,  # Same as seller for unlisting
                 price=listing.price,
                 transaction_type='unlisting',
-                blockchain_tx_id=blockchain_tx_id,
-                status='completed'
+                blockchain_tx_id=blockchain_tx_id
             )
             
-            self.db.add(transaction)
-            self.db.commit()
-            self.db.refresh(transaction)
+            self.db.flush()
             
             logger.info(f"Successfully cancelled listing for NFT {nft_id}")
             
@@ -341,7 +352,6 @@ class BlockchainListingService:
             }
             
         except Exception as e:
-            self.db.rollback()
             logger.error(f"Error cancelling blockchain listing: {e}")
             raise
     
@@ -356,44 +366,38 @@ class BlockchainListingService:
         Update listing price in the database after successful blockchain transaction
         """
         try:
-            # Resolve identifier and find the active listing
-            resolved_nft_id = self._resolve_nft_uuid(nft_id)
-            listing = self.db.query(Listing).filter(
-                and_(
-                    Listing.nft_id == resolved_nft_id,
-                    Listing.seller_wallet_address == seller_wallet_address,
-                    Listing.status == 'active'
-                )
-            ).first()
+            # Resolve identifier, then reprice the active listing in one statement.
+            # SET expressions see the pre-update row, so Listing.price is the old price.
+            resolved_nft_id = self._resolve_nft(nft_id, with_listings=False).id
+            listing = self._transition_active_listing(
+                resolved_nft_id,
+                seller_wallet_address,
+                {'price': new_price},
+                {
+                    'price_update_tx_id': blockchain_tx_id,
+                    'price_updated_at': blockchain_tx_id
+                },
+                (Listing.id, Listing.listing_metadata),
+                metadata_expr=func.jsonb_build_object('previous_price', Listing.price)
+            )
             
             if not listing:
                 raise ValueError(f"No active listing found for NFT {nft_id}")
             
-            old_price = listing.price
-            listing.price = new_price
-            
-            # Update metadata
-            if not listing.listing_metadata:
-                listing.listing_metadata = {}
-            listing.listing_metadata['price_update_tx_id'] = blockchain_tx_id
-            listing.listing_metadata['previous_price'] = float(old_price)
-            listing.listing_metadata['price_updated_at'] = blockchain_tx_id
+            old_price = float(listing.listing_metadata['previous_price'])
             
             # Create transaction history
-            transaction = TransactionHistory(
+            self._record_transaction(
                 nft_id=resolved_nft_id,
                 listing_id=listing.id,
                 seller_wallet_address=seller_wallet_address,
                 buyer_wallet_address=seller_wallet_address,  # Same as seller for price update
                 price=new_price,
                 transaction_type='edit_listing',
-                blockchain_tx_id=blockchain_tx_id,
-                status='completed'
+                blockchain_tx_id=blockchain_tx_id
             )
             
-            self.db.add(transaction)
-            self.db.commit()
-            self.db.refresh(transaction)
+            self.db.flush()
             
             logger.info(f"Successfully updated listing price for NFT {nft_id} from {old_price} to {new_price}")
             
@@ -401,13 +405,12 @@ class BlockchainListingService:
                 'success': True,
                 'nft_id': str(resolved_nft_id),
                 'seller_wallet_address': seller_wallet_address,
-                'old_price': float(old_price),
+                'old_price': old_price,
                 'new_price': new_price,
                 'blockchain_tx_id': blockchain_tx_id
             }
             
         except Exception as e:
-            self.db.rollback()
             logger.error(f"Error updating blockchain listing price: {e}")
             raise
 
@@ -417,13 +420,9 @@ class BlockchainListingService:
         Returns blockchain metadata if available
         """
         try:
-            resolved_nft_id = self._resolve_nft_uuid(nft_id)
-            listing = self.db.query(Listing).filter(
-                and_(
-                    Listing.nft_id == resolved_nft_id,
-                    Listing.status == 'active'
-                )
-            ).first()
+            nft = self._resolve_nft(nft_id)
+            resolved_nft_id = nft.id
+            listing = nft.active_listings[0] if nft.active_listings else None
             
             if not listing:
                 return None
@@ -435,9 +434,8 @@ class BlockchainListingService:
                 'price': float(listing.price),
                 'status': listing.status,
                 'created_at': listing.created_at.isoformat(),
-                'blockchain_metadata': listing.listing_metadata or {},
-                'is_blockchain_listing': bool(listing.listing_metadata and 
-                                           listing.listing_metadata.get('blockchain_tx_id'))
+                'blockchain_metadata': listing.listing_metadata,
+                'is_blockchain_listing': bool(listing.listing_metadata.get('blockchain_tx_id'))
             }
             
         except Exception as e:
@@ -9,15 +9,90 @@ The LLM automatically decides which source to use based on query context,
 ensuring users get the most relevant and accurate information.
 """
 
+import asyncio
+import hashlib
+import logging
 import os
+import re
+from functools import lru_cache
+from dotenv import load_dotenv
 import google.generativeai as genai
-from tavily import TavilyClient
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "tvly-dev-xxx")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "api_key")
+# Load .env before reading keys so the shared clients below are built with them
+# regardless of which module happens to be imported first
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 genai.configure(api_key=GOOGLE_API_KEY)
 
+GEMINI_MODEL_NAME = "gemini-2.5-flash"
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+# Short-lived response caches for repeated queries (retries, popular questions).
+# Only touched from the event loop thread, so no locking is needed.
+RESPONSE_CACHE_TTL_SECONDS = 600
+_search_cache = TTLCache(maxsize=1024, ttl=RESPONSE_CACHE_TTL_SECONDS)
+_summary_cache = TTLCache(maxsize=1024, ttl=RESPONSE_CACHE_TTL_SECONDS)
+
+
+def _cache_key(*parts):
+    """Compact cache key from normalized text parts"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.strip().lower().encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _get_http_session():
+    """
+    Shared keep-alive HTTP session for Tavily traffic.
+    Pooled connections skip a TCP/TLS handshake per query; transient
+    429/5xx responses are retried briefly.
+    """
+    retry = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"})  # Tavily search is a read-only POST
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _tavily_search(query, max_results=3, include_images=True):
+    """Call the Tavily search REST API over the shared session"""
+    response = _get_http_session().post(
+        TAVILY_SEARCH_URL,
+        json={
+            "query": query,
+            "max_results": max_results,
+            "include_images": include_images
+        },
+        headers={"Authorization": f"Bearer {TAVILY_API_KEY}"},
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+@lru_cache(maxsize=4)
+def _get_gemini_model(system_instruction=None):
+    """Shared Gemini model wrapper per system instruction (stateless, safe to reuse across requests)"""
+    return genai.GenerativeModel(GEMINI_MODEL_NAME, system_instruction=system_instruction)
+
 
 def validate_environment():
     """Check if required API keys are set"""
@@ -32,8 +107,18 @@ def validate_environment():
     return True, None
 
 
+# Keys only come from the environment, so validate once at import; with keys
+# missing the public functions return their fallbacks without any network calls
+CHAT_ENABLED, CHAT_DISABLED_REASON = validate_environment()
+
+
+@lru_cache(maxsize=1)
 def load_local_knowledge():
-    """Load local documentation files for FraudGuard platform knowledge"""
+    """
+    Load local documentation files for FraudGuard platform knowledge.
+    The files are static for the lifetime of the process, so the combined
+    text is read once and cached.
+    """
     knowledge_files = [
         "README.md",
         "track_1.md",
@@ -42,18 +127,19 @@ def load_local_knowledge():
         "tech_stack.md"
     ]
 
-    combined_knowledge = ""
+    parts = []
 
     for file_path in knowledge_files:
         if os.path.exists(file_path):
             try:
                 with open(file_path, "r", encoding="utf-8") as f:
                     content = f.read()
-                    combined_knowledge += f"\n\n=== {file_path} ===\n{content}"
+                    parts.append(f"\n\n=== {file_path} ===\n{content}")
             except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+                logger.warning(f"Error reading {file_path}: {e}")
                 continue
 
+    combined_knowledge = "".join(parts)
     
     if not combined_knowledge:
         combined_knowledge = """
@@ -69,23 +155,38 @@ FraudGuard is an AI-powered NFT marketplace built on the Sui blockchain that pro
     return combined_knowledge
 
 
-def search_nft_news(query):
+async def search_nft_news(query):
     """Search for NFT news using Tavily API"""
+    if not CHAT_ENABLED:
+        return None
+
+    key = _cache_key(query)
+    cached = _search_cache.get(key)
+    if cached is not None:
+        return cached
+
     try:
-        tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
-        res = tavily_client.search(
+        # requests is blocking; run it off the event loop
+        res = await asyncio.to_thread(
+            _tavily_search,
             query=f"NFT market update for {query}",
             include_images=True,
             max_results=3
         )
+        if res:
+            _search_cache[key] = res
         return res
     except Exception as e:
-        print(f"Error in search_nft_news: {e}")
+        logger.warning(f"Error in search_nft_news: {e}")
         return None
 
 
+@lru_cache(maxsize=256)
 def fallback_search(query):
-    """Fallback search if Tavily fails"""
+    """
+    Fallback search if Tavily fails.
+    Memoized per query; callers only read the returned dict and must not mutate it.
+    """
     return {
         "results": [{
             "title": f"NFT Market Analysis for {query}",
@@ -96,13 +197,43 @@ def fallback_search(query):
     }
 
 
-def decide_data_source(query, local_data):
+_LOCAL_KEYWORDS = re.compile(
+    r"\b(fraudguard|listing|list|buy|sell|fraud detect\w*|tech stack|architecture|sui|"
+    r"smart contract|contract|plagiarism|how (?:to|do i))\b",
+    re.IGNORECASE
+)
+_LIVE_KEYWORDS = re.compile(
+    r"\b(price|prices|trend|trends|trending|market|news|today|volume|floor|crypto)\b",
+    re.IGNORECASE
+)
+
+
+def _keyword_route(query):
+    """
+    Cheap keyword router. Returns "local" or "live" when exactly one keyword
+    family matches, or None when the query is ambiguous and needs the LLM.
     """
-    Let the LLM decide whether to use:
+    is_local = _LOCAL_KEYWORDS.search(query) is not None
+    is_live = _LIVE_KEYWORDS.search(query) is not None
+    if is_local == is_live:
+        return None
+    return "local" if is_local else "live"
+
+
+async def decide_data_source(query, local_data):
+    """
+    Decide whether to use:
     - Local FraudGuard documentation (tech stack, features, how the platform works)
     - Live NFT news search (market trends, current events, general NFT knowledge)
+    Unambiguous queries are routed by keyword; the LLM is only asked otherwise.
     """
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    keyword_choice = _keyword_route(query)
+    if keyword_choice:
+        return keyword_choice
+    if not CHAT_ENABLED:
+        return "live"
+
+    model = _get_gemini_model()
     decision_prompt = f"""
 You are an intelligent routing system for a FraudGuard NFT marketplace chatbot.
 
@@ -146,26 +277,15 @@ Local Knowledge Preview:
 Respond with EXACTLY one word: "local" or "live"
     """
     try:
-        resp = model.generate_content(decision_prompt)
+        resp = await model.generate_content_async(decision_prompt)
         choice = resp.text.strip().lower()
         return "local" if "local" in choice else "live"
     except Exception:
         return "live"  
 
-def summarize_with_gemini(query, context_text, data_source="unknown"):
-    """Generate context-aware summary with Gemini AI"""
-    try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-
-        if data_source == "local":
-            prompt = f"""
+_LOCAL_SYSTEM_INSTRUCTION = """
 You are a FraudGuard platform expert and technical assistant.
 
-User Query: {query}
-
-FraudGuard Platform Information:
-{context_text}
-
 As a FraudGuard expert, please provide a helpful response that:
 1. Directly answers the user's question about FraudGuard
 2. Explains relevant platform features and capabilities
@@ -192,14 +312,9 @@ IMPORTANT: Format your response using proper markdown syntax and emojis:
   * 🚀 for advanced features
   * 📱 for user interface features
 """
-        else:
-            prompt = f"""
-You are an expert NFT market analyst and blockchain technology specialist.
-
-User Query: {query}
 
-Current Market Context:
-{context_text}
+_LIVE_SYSTEM_INSTRUCTION = """
+You are an expert NFT market analyst and blockchain technology specialist.
 
 Please provide:
 1. Key market insights or knowledge relevant to the query
@@ -230,44 +345,151 @@ IMPORTANT: Format your response using proper markdown syntax and emojis:
   * 🎯 for targets and goals
 """
 
-        response = model.generate_content(prompt)
+# Only the per-request part is sent as the prompt; the static persona and
+# formatting rules above ride along as the model's system_instruction
+_LOCAL_SUMMARY_PROMPT = """
+User Query: {query}
+
+FraudGuard Platform Information:
+{context_text}
+"""
+
+_LIVE_SUMMARY_PROMPT = """
+User Query: {query}
+
+Current Market Context:
+{context_text}
+"""
+
+
+def _build_summary_prompt(query, context_text, data_source):
+    """
+    Pick the summarization model and fill its prompt template for the chosen data source.
+    Returns (model, prompt).
+    """
+    if data_source == "local":
+        return _get_gemini_model(_LOCAL_SYSTEM_INSTRUCTION), _LOCAL_SUMMARY_PROMPT.format(query=query, context_text=context_text)
+    return _get_gemini_model(_LIVE_SYSTEM_INSTRUCTION), _LIVE_SUMMARY_PROMPT.format(query=query, context_text=context_text)
+
+
+async def summarize_with_gemini(query, context_text, data_source="unknown"):
+    """Generate context-aware summary with Gemini AI"""
+    if not CHAT_ENABLED:
+        return f"Unable to generate summary. Raw context: {context_text[:500]}..."
+
+    key = _cache_key(data_source, query, context_text)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        model, prompt = _build_summary_prompt(query, context_text, data_source)
+        response = await model.generate_content_async(prompt)
+        _summary_cache[key] = response.text
         return response.text
     except Exception:
         return f"Unable to generate summary. Raw context: {context_text[:500]}..."
 
 
-def get_nft_market_analysis(user_query):
-    """Main logic: Decide data source, fetch, summarize"""
+async def stream_summary_with_gemini(query, context_text, data_source="unknown"):
+    """Stream the context-aware summary from Gemini AI chunk by chunk"""
+    if not CHAT_ENABLED:
+        yield f"Unable to generate summary. Raw context: {context_text[:500]}..."
+        return
+
+    key = _cache_key(data_source, query, context_text)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    try:
+        model, prompt = _build_summary_prompt(query, context_text, data_source)
+        response = await model.generate_content_async(prompt, stream=True)
+        chunks = []
+        async for chunk in response:
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+        _summary_cache[key] = "".join(chunks)
+    except Exception:
+        yield f"Unable to generate summary. Raw context: {context_text[:500]}..."
+
+
+async def _gather_context(user_query):
+    """Decide the data source and fetch its context. Returns (context, images, source_choice)"""
     local_data = load_local_knowledge()
 
-    source_choice = decide_data_source(user_query, local_data)
-    print(f"[DEBUG] Data source chosen: {source_choice}")
+    source_choice = _keyword_route(user_query)
+    search_task = None
+    if source_choice is None:
+        # Ambiguous query: start the live search speculatively so it overlaps the
+        # LLM routing round-trip; it is cancelled if routing picks local documentation
+        search_task = asyncio.create_task(search_nft_news(user_query))
+        source_choice = await decide_data_source(user_query, local_data)
+    logger.debug(f"Data source chosen: {source_choice}")
 
     context = ""
     images = []
 
     if source_choice == "local" and local_data:
+        if search_task:
+            search_task.cancel()
         context = local_data
-        print(f"[DEBUG] Using local FraudGuard documentation")
+        logger.debug("Using local FraudGuard documentation")
     else:
-        print(f"[DEBUG] Using live NFT news search")
-        search_results = search_nft_news(user_query) or fallback_search(user_query)
+        logger.debug("Using live NFT news search")
+        if search_task is None:
+            search_task = search_nft_news(user_query)
+        search_results = await search_task or fallback_search(user_query)
         results = search_results.get("results", [])
 
+        parts = []
         for i, item in enumerate(results[:3], 1):
-            title = item.get('title', 'No title')
-            url = item.get('url', 'No URL')
-            content = item.get('content', 'No content available')
-            context += f"{i}. {title}\nSource: {url}\nContent: {content}\n\n"
+            parts.append(
+                f"{i}. {item.get('title', 'No title')}\n"
+                f"Source: {item.get('url', 'No URL')}\n"
+                f"Content: {item.get('content', 'No content available')}\n\n"
+            )
+            item_images = item.get("images")
+            if item_images:
+                images.extend(item_images)
+        context = "".join(parts)
 
-            if item.get("images"):
-                images.extend(item["images"])
+    return context, images, source_choice
 
-    summary = summarize_with_gemini(user_query, context, source_choice)
+
+async def get_nft_market_analysis(user_query):
+    """Main logic: Decide data source, fetch, summarize"""
+    context, images, source_choice = await _gather_context(user_query)
+    summary = await summarize_with_gemini(user_query, context, source_choice)
 
     return {
         "query": user_query,
         "summary": summary,
         "images": images[:3],
         "data_source": source_choice
-    }
\ No newline at end of file
+    }
+
+
+async def analyze_many(queries):
+    """Run get_nft_market_analysis for several queries concurrently, results in input order"""
+    return await asyncio.gather(*(get_nft_market_analysis(query) for query in queries))
+
+
+async def stream_nft_market_analysis(user_query):
+    """
+    Streaming variant of get_nft_market_analysis.
+    Yields a metadata dict first (query, images, data_source), then summary text chunks
+    as Gemini produces them.
+    """
+    context, images, source_choice = await _gather_context(user_query)
+
+    yield {
+        "query": user_query,
+        "images": images[:3],
+        "data_source": source_choice
+    }
+
+    async for text in stream_summary_with_gemini(user_query, context, source_choice):
+        yield text
@@ -3,23 +3,189 @@ Description-based Embedding Service for FraudGuard
 Uses Gemini to analyze images and generate descriptions, then creates embeddings from those descriptions
 """
 
+import hashlib
 import logging
-from typing import List, Optional, Dict, Any
+import time
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 import asyncio
+import numpy as np
+from cachetools import LRUCache
+from sqlalchemy import select
 
 try:
-    from agent.gemini_image_analyzer import get_gemini_analyzer
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    from agent.gemini_image_analyzer import get_gemini_analyzer, to_vector_literal
     from agent.supabase_client import supabase_client
 except ImportError:
     try:
-        from backend.agent.gemini_image_analyzer import get_gemini_analyzer
+        from backend.agent.gemini_image_analyzer import get_gemini_analyzer, to_vector_literal
         from backend.agent.supabase_client import supabase_client
     except ImportError:
         get_gemini_analyzer = None
         supabase_client = None
 
+try:
+    from models.database import NFT, quantize_embedding
+    from database import connection as db_connection
+except ImportError:
+    from backend.models.database import NFT, quantize_embedding
+    from backend.database import connection as db_connection
+
 logger = logging.getLogger(__name__)
 
+LOCAL_INDEX_TTL_SECONDS = 300
+RERANK_CANDIDATES = 50
+URL_EMBEDDING_CACHE_SIZE = 4096
+DESCRIPTION_EMBEDDING_CACHE_SIZE = 50_000
+
+
+def _description_key(kind: str, description: str) -> bytes:
+    """
+    Cache key for a description's embedding. kind names the embedding task type;
+    embed_text and batch_embed_texts both produce query-style vectors, so their
+    entries are shared.
+    """
+    return hashlib.blake2b(f"{kind}\x00{description}".encode("utf-8"), digest_size=16).digest()
+
+
+def _cosine_scores_numpy(query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Cosine similarity of query against every row of an (N, d) int8 code matrix"""
+    matrix = codes.astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12
+    return (matrix @ query) / norms
+
+
+if numba:
+    # Compiled lazily on first call (then cached on disk), so imports and worker
+    # spawns do not pay for a fallback path that is rarely used
+    @numba.njit(parallel=True, fastmath=True, cache=True, nogil=True)
+    def cosine_scores(query, codes):
+        """Cosine similarity of query against every row of an (N, d) int8 code matrix"""
+        n, d = codes.shape
+        out = np.empty(n, dtype=np.float32)
+        query_norm = np.float32(0.0)
+        for j in range(d):
+            query_norm += query[j] * query[j]
+        query_norm = np.sqrt(query_norm)
+        for i in numba.prange(n):
+            dot = np.float32(0.0)
+            row_norm = np.float32(0.0)
+            for j in range(d):
+                value = np.float32(codes[i, j])
+                dot += query[j] * value
+                row_norm += value * value
+            out[i] = dot / (np.sqrt(row_norm) * query_norm + np.float32(1e-12))
+        return out
+else:
+    cosine_scores = _cosine_scores_numpy
+
+
+class LocalEmbeddingIndex:
+    """
+    In-process exact search over the int8-quantized NFT embeddings, used when
+    the Supabase RPC is unavailable. Codes are loaded lazily and refreshed after
+    a TTL; the top candidates are reranked against their float32 embeddings.
+    """
+    
+    def __init__(self, ttl_seconds: float = LOCAL_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._ids: List[Any] = []
+        self._codes: Optional[np.ndarray] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    def _is_fresh(self) -> bool:
+        return self._codes is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+    
+    async def _ensure_loaded(self) -> None:
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                self._ids, self._codes = await asyncio.to_thread(self._load)
+                self._loaded_at = time.monotonic()
+                logger.info(f"Loaded {len(self._ids)} quantized embeddings into the local index")
+    
+    def _load(self) -> Tuple[List[Any], np.ndarray]:
+        db = db_connection.SessionLocal()
+        try:
+            rows = db.execute(
+                select(NFT.id, NFT.embedding_int8).where(NFT.embedding_int8.isnot(None))
+            ).all()
+            # Rows embedded before the int8 columns existed keep NULL codes until
+            # re-embedded; quantize them here so the whole catalog is searchable
+            unquantized = db.execute(
+                select(NFT.id, NFT.embedding_vector)
+                .where(NFT.embedding_int8.is_(None), NFT.embedding_vector.isnot(None))
+            ).all()
+        finally:
+            db.close()
+        
+        ids = [row.id for row in rows]
+        chunks = [row.embedding_int8 for row in rows]
+        for row in unquantized:
+            codes, _ = quantize_embedding(row.embedding_vector)
+            if codes is not None:
+                ids.append(row.id)
+                chunks.append(codes)
+        
+        if not ids:
+            return [], np.empty((0, 0), dtype=np.int8)
+        # bytearray keeps the matrix writable/contiguous, which the jitted kernel expects
+        codes = np.frombuffer(bytearray(b"".join(chunks)), dtype=np.int8)
+        return ids, codes.reshape(len(ids), -1)
+    
+    def _rerank(self, query: np.ndarray, candidate_ids: List[Any], threshold: float, limit: int) -> List[Dict[str, Any]]:
+        db = db_connection.SessionLocal()
+        try:
+            rows = db.execute(
+                select(NFT.id, NFT.title, NFT.image_url, NFT.creator_wallet_address, NFT.embedding_vector)
+                .where(NFT.id.in_(candidate_ids))
+            ).all()
+        finally:
+            db.close()
+        
+        results = []
+        query_norm = np.linalg.norm(query)
+        for row in rows:
+            if row.embedding_vector is None:
+                continue
+            vector = np.asarray(row.embedding_vector, dtype=np.float32)
+            similarity = float(vector @ query / (np.linalg.norm(vector) * query_norm + 1e-12))
+            if similarity >= threshold:
+                results.append({
+                    "nft_id": str(row.id),
+                    "title": row.title,
+                    "image_url": row.image_url,
+                    "creator_wallet_address": row.creator_wallet_address,
+                    "similarity": similarity
+                })
+        results.sort(key=lambda result: result["similarity"], reverse=True)
+        return results[:limit]
+    
+    async def search(self, embedding: Sequence[float], threshold: float, limit: int) -> List[Dict[str, Any]]:
+        """Return up to limit NFTs with cosine similarity >= threshold, best first"""
+        if not db_connection.db_available or not db_connection.SessionLocal:
+            return []
+        
+        await self._ensure_loaded()
+        ids, codes = self._ids, self._codes
+        if not ids:
+            return []
+        
+        query = np.ascontiguousarray(embedding, dtype=np.float32)
+        scores = await asyncio.to_thread(cosine_scores, query, codes)
+        top_k = min(max(limit, RERANK_CANDIDATES), len(ids))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        candidate_ids = [ids[i] for i in top if scores[i] >= threshold - 0.05]
+        if not candidate_ids:
+            return []
+        return await asyncio.to_thread(self._rerank, query, candidate_ids, threshold, limit)
+
 
 class DescriptionEmbeddingService:
     """
@@ -30,27 +196,37 @@ class DescriptionEmbeddingService:
     def __init__(self):
         self.gemini_analyzer = None
         self.initialized = False
+        self._init_lock = asyncio.Lock()
+        # image URL -> float32 embedding, so repeated URLs skip Gemini entirely
+        self._url_embeddings = LRUCache(maxsize=URL_EMBEDDING_CACHE_SIZE)
+        # description hash -> normalized float32 embedding; images in a collection
+        # often get identical descriptions, so their embedding calls are free
+        self._description_embeddings = LRUCache(maxsize=DESCRIPTION_EMBEDDING_CACHE_SIZE)
+        self.local_index = LocalEmbeddingIndex()
     
     async def initialize(self) -> bool:
-        """Initialize the embedding service"""
-        try:
-            if get_gemini_analyzer:
-                self.gemini_analyzer = await get_gemini_analyzer()
-                if self.gemini_analyzer:
-                    await self.gemini_analyzer.initialize()
-                    self.initialized = True
-                    logger.info("Description embedding service initialized successfully")
-                    return True
-            
-            logger.warning("Gemini analyzer not available, service will not be available")
-            self.initialized = True
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize description embedding service: {e}")
-            return False
+        """Initialize the embedding service (once, even under concurrent callers)"""
+        async with self._init_lock:
+            if self.initialized:
+                return True
+            try:
+                if get_gemini_analyzer:
+                    self.gemini_analyzer = await get_gemini_analyzer()
+                    if self.gemini_analyzer:
+                        await self.gemini_analyzer.initialize()
+                        self.initialized = True
+                        logger.info("Description embedding service initialized successfully")
+                        return True
+                
+                logger.warning("Gemini analyzer not available, service will not be available")
+                self.initialized = True
+                return True
+                
+            except Exception as e:
+                logger.error(f"Failed to initialize description embedding service: {e}")
+                return False
     
-    async def get_image_embedding(self, image_url: str) -> Optional[List[float]]:
+    async def get_image_embedding(self, image_url: str) -> Optional[np.ndarray]:
         """
         Analyze image with Gemini to get description, then generate embedding from description
         
@@ -58,9 +234,13 @@ class DescriptionEmbeddingService:
             image_url: URL of the image to analyze
             
         Returns:
-            List of floats representing the embedding vector
+            float32 array representing the embedding vector
         """
         try:
+            cached = self._url_embeddings.get(image_url)
+            if cached is not None:
+                return cached
+            
             if not self.initialized:
                 await self.initialize()
             
@@ -72,10 +252,16 @@ class DescriptionEmbeddingService:
             if not description:
                 raise Exception(f"Could not extract description from image: {image_url}")
             
-            embedding = await self.gemini_analyzer.embed_text(description)
+            description_key = _description_key("query", description)
+            embedding = self._description_embeddings.get(description_key)
+            if embedding is None:
+                embedding = np.asarray(await self.gemini_analyzer.embed_text(description), dtype=np.float32)
+                if embedding.size:
+                    self._description_embeddings[description_key] = embedding
             
-            if embedding:
-                logger.info(f"Successfully generated embedding with dimension: {len(embedding)}")
+            if embedding.size:
+                logger.info(f"Successfully generated embedding with dimension: {embedding.size}")
+                self._url_embeddings[image_url] = embedding
                 return embedding
             else:
                 raise Exception("Failed to generate embedding from description")
@@ -84,6 +270,37 @@ class DescriptionEmbeddingService:
             logger.error(f"Error generating image embedding: {e}")
             raise e
     
+    async def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Generate embeddings for several descriptions with one batched provider call
+        
+        Args:
+            texts: Descriptions to embed
+            
+        Returns:
+            One float32 embedding vector per input text, in input order
+        """
+        if not self.initialized:
+            await self.initialize()
+        
+        if not self.gemini_analyzer:
+            raise Exception("Gemini analyzer not available")
+        
+        if not texts:
+            return []
+        
+        keys = [_description_key("query", text) for text in texts]
+        found = {key: self._description_embeddings.get(key) for key in keys}
+        # Only descriptions not seen before (and each only once) go to the provider
+        missing = {key: text for key, text in zip(keys, texts) if found[key] is None}
+        if missing:
+            fresh = await self.gemini_analyzer.batch_embed_texts(list(missing.values()))
+            for key, embedding in zip(missing, fresh):
+                found[key] = self._description_embeddings[key] = np.asarray(embedding, dtype=np.float32)
+            logger.info(f"Generated {len(fresh)} embeddings in one batch call ({len(texts) - len(fresh)} cached)")
+        
+        return [found[key] for key in keys]
+    
     async def get_image_embedding_and_store(self, image_url: str, nft_id: str, metadata: Dict[str, Any]) -> bool:
         """
         Generate embedding and store it in Supabase for vector search
@@ -104,7 +321,7 @@ class DescriptionEmbeddingService:
             # Since embeddings are stored directly in the nfts table,
             # this function mainly serves to ensure the embedding is generated
             embedding = await self.get_image_embedding(image_url)
-            if embedding:
+            if embedding is not None:
                 logger.info(f"Generated embedding for NFT {nft_id}, stored in main NFT record")
                 return True
             else:
@@ -115,12 +332,12 @@ class DescriptionEmbeddingService:
             logger.error(f"Error in embedding generation: {e}")
             return False
     
-    async def find_similar_images(self, embedding: List[float], threshold: float = 0.8, limit: int = 10) -> List[Dict[str, Any]]:
+    async def find_similar_images(self, embedding: Sequence[float], threshold: float = 0.8, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Find similar images based on embedding similarity using the nfts table
         
         Args:
-            embedding: The embedding vector to search for
+            embedding: The embedding vector to search for (list or ndarray)
             threshold: Similarity threshold (0-1)
             limit: Maximum number of results to return
             
@@ -129,15 +346,16 @@ class DescriptionEmbeddingService:
         """
         try:
             if not supabase_client:
-                logger.warning("Supabase client not available, returning empty results")
-                return []
+                logger.warning("Supabase client not available, searching the local embedding index")
+                return await self.local_index.search(embedding, threshold, limit)
             
             # Use Supabase's vector similarity search on the nfts table
             # This requires a custom RPC function to search embeddings
             result = supabase_client.rpc(
                 "search_similar_nft_embeddings",
                 {
-                    "query_embedding": embedding,
+                    # Pre-encoded pgvector literal: one short JSON string instead of a 768-float array
+                    "query_embedding": to_vector_literal(embedding),
                     "similarity_threshold": threshold,
                     "match_count": limit
                 }
@@ -152,10 +370,20 @@ class DescriptionEmbeddingService:
                 
         except Exception as e:
             logger.error(f"Error searching for similar images: {e}")
-            # Fallback: return empty list instead of failing
-            return []
+            # Fallback: exact in-process search, or an empty list if that fails too
+            try:
+                return await self.local_index.search(embedding, threshold, limit)
+            except Exception as local_error:
+                logger.error(f"Local embedding index search failed: {local_error}")
+                return []
     
-    async def batch_analyze_and_embed(self, image_urls: List[str], nft_ids: List[str], metadata_list: List[Dict[str, Any]]) -> List[bool]:
+    async def batch_analyze_and_embed(
+        self,
+        image_urls: List[str],
+        nft_ids: List[str],
+        metadata_list: List[Dict[str, Any]],
+        max_concurrency: int = 8
+    ) -> List[bool]:
         """
         Batch process multiple images for embedding generation and storage
         
@@ -163,30 +391,60 @@ class DescriptionEmbeddingService:
             image_urls: List of image URLs to process
             nft_ids: List of corresponding NFT IDs
             metadata_list: List of metadata dictionaries
+            max_concurrency: Maximum number of images processed at once (keeps Gemini under rate limits)
             
         Returns:
-            List of boolean success indicators
+            List of boolean success indicators, in input order
         """
         try:
             if len(image_urls) != len(nft_ids) or len(image_urls) != len(metadata_list):
                 raise ValueError("All input lists must have the same length")
             
-            # Process in parallel for better performance
-            tasks = [
-                self.get_image_embedding_and_store(url, nft_id, metadata)
-                for url, nft_id, metadata in zip(image_urls, nft_ids, metadata_list)
-            ]
+            if not self.initialized:
+                await self.initialize()
             
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if not self.gemini_analyzer:
+                raise Exception("Gemini analyzer not available")
             
-            # Convert exceptions to False
-            success_results = []
-            for result in results:
-                if isinstance(result, Exception):
-                    logger.error(f"Batch processing error: {result}")
-                    success_results.append(False)
+            # Each distinct URL is described and embedded once, then fanned back out;
+            # URLs already embedded by an earlier call are skipped entirely. Results are
+            # tracked per batch, since the shared LRU may evict them mid-batch
+            batch_embeddings: Dict[str, np.ndarray] = {}
+            pending_urls = []
+            for url in dict.fromkeys(image_urls):
+                cached = self._url_embeddings.get(url)
+                if cached is not None:
+                    batch_embeddings[url] = cached
                 else:
-                    success_results.append(result)
+                    pending_urls.append(url)
+            
+            semaphore = asyncio.Semaphore(max_concurrency)
+            descriptions: List[Optional[str]] = [None] * len(pending_urls)
+            
+            async def describe(index: int, url: str):
+                async with semaphore:
+                    try:
+                        descriptions[index] = await self.gemini_analyzer.extract_image_description(url)
+                    except Exception as e:
+                        logger.error(f"Batch processing error: {e}")
+            
+            # Descriptions need one multimodal call per image...
+            await asyncio.gather(*(describe(index, url) for index, url in enumerate(pending_urls)))
+            
+            # ...but all of them can be embedded in a single batched request
+            described = [index for index, description in enumerate(descriptions) if description]
+            if described:
+                embeddings = await self.embed_texts([descriptions[index] for index in described])
+                for index, embedding in zip(described, embeddings):
+                    if embedding.size:
+                        # Query-type vectors, the same space get_image_embedding serves
+                        batch_embeddings[pending_urls[index]] = embedding
+                        self._url_embeddings[pending_urls[index]] = embedding
+            
+            success_results = [url in batch_embeddings for url in image_urls]
+            for nft_id, success in zip(nft_ids, success_results):
+                if not success:
+                    logger.error(f"Could not generate embedding for NFT {nft_id}")
             
             logger.info(f"Batch processing completed: {sum(success_results)}/{len(success_results)} successful")
             return success_results
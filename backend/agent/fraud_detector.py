@@ -3,11 +3,20 @@ Unified Fraud Detection Engine for FraudGuard
 LLM-powered fraud analysis using Google Gemini with LangGraph workflow
 """
 import asyncio
+import copy
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field, asdict
 from datetime import datetime
 import os
+import reprlib
+import time
+import numpy as np
+import orjson
+from cachetools import LRUCache, TTLCache
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator, model_validator
+from sqlalchemy import text, bindparam, select, update
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -15,27 +24,298 @@ try:
     from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
     from langchain_core.prompts import ChatPromptTemplate
     from langchain_core.output_parsers import JsonOutputParser
+    from langchain_core.messages import SystemMessage, HumanMessage
+    from langchain_core.exceptions import OutputParserException
 except ImportError:
     ChatGoogleGenerativeAI = None
     GoogleGenerativeAIEmbeddings = None
     ChatPromptTemplate = None
     JsonOutputParser = None
+    SystemMessage = None
+    HumanMessage = None
+    OutputParserException = None
+
+try:
+    import asyncpg
+    from pgvector.asyncpg import register_vector as register_asyncpg_vector
+except ImportError:
+    asyncpg = None
+    register_asyncpg_vector = None
+
+try:
+    from pgvector.sqlalchemy import Vector
+except ImportError:
+    Vector = None
 
 try:
     from core.config import settings
     from agent.gemini_image_analyzer import get_gemini_analyzer
     from agent.supabase_client import get_supabase_client
     from agent.sui_client import get_sui_client
+    from agent.gemini_calls import call_gemini, RETRYABLE_GEMINI_ERRORS
+    from agent.micro_batcher import MicroBatcher
+    from agent.semantic_decision_cache import SemanticDecisionCache, metadata_hash
+    from agent.nft_vector_index import NFTVectorIndex, EMBEDDING_DIMENSION
+    from database.connection import get_db
+    from models.database import NFT, quantize_embedding
 except ImportError:
     from backend.core.config import settings
     from backend.agent.gemini_image_analyzer import get_gemini_analyzer
     from backend.agent.supabase_client import get_supabase_client
     from backend.agent.sui_client import get_sui_client
+    from backend.agent.gemini_calls import call_gemini, RETRYABLE_GEMINI_ERRORS
+    from backend.agent.micro_batcher import MicroBatcher
+    from backend.agent.semantic_decision_cache import SemanticDecisionCache, metadata_hash
+    from backend.agent.nft_vector_index import NFTVectorIndex, EMBEDDING_DIMENSION
+    from backend.database.connection import get_db
+    from backend.models.database import NFT, quantize_embedding
 
 logger = logging.getLogger(__name__)
 
+# Image analysis fields reported in analysis_details, with their defaults
+_IMAGE_ANALYSIS_DETAIL_DEFAULTS = {
+    "description": "",
+    "artistic_style": "",
+    "quality_assessment": "",
+    "fraud_indicators": {},
+    "overall_fraud_score": 0.0,
+    "risk_level": "unknown",
+    "key_visual_elements": [],
+    "color_palette": [],
+    "composition_analysis": "",
+    "uniqueness_score": 0.0,
+    "artistic_merit": "",
+    "technical_quality": "",
+    "market_value_assessment": "",
+    "recommendation": "",
+    "confidence_in_analysis": 0.0,
+    "additional_notes": "",
+    "embedding": [],
+    "embedding_dimension": 0
+}
+
+# analysis_details["image_analysis"] when the whole analysis fails. Kept serialized:
+# one orjson.loads yields a fresh copy for the exception path to fill in, cheaper
+# than deep-copying (or rebuilding) the nested dicts on every error during an outage
+_FAILED_IMAGE_ANALYSIS_FIELDS = {
+    **_IMAGE_ANALYSIS_DETAIL_DEFAULTS,
+    "artistic_style": "unknown",
+    "quality_assessment": "Analysis failed",
+    "composition_analysis": "Analysis failed",
+    "artistic_merit": "Analysis failed",
+    "technical_quality": "Analysis failed",
+    "market_value_assessment": "Analysis failed",
+    "recommendation": "Manual review required"
+}
+_EMPTY_IMAGE_ANALYSIS_JSON = orjson.dumps(_FAILED_IMAGE_ANALYSIS_FIELDS)
+# The module-level analyze_nft_for_fraud also reports every image fraud indicator
+_ERROR_IMAGE_ANALYSIS_JSON = orjson.dumps({
+    **_FAILED_IMAGE_ANALYSIS_FIELDS,
+    "fraud_indicators": {
+        name: {"detected": False, "confidence": 0.0, "evidence": "Analysis failed"}
+        for name in (
+            "low_effort_generation", "stolen_artwork", "ai_generated", "template_usage",
+            "metadata_mismatch", "copyright_violation", "inappropriate_content"
+        )
+    }
+})
+
+# Similar NFTs (and evidence URLs) kept per analysis, closest first
+TOP_SIMILAR_NFTS = 3
+
+# Completed Gemini Vision analyses kept in memory, keyed by image + metadata hash
+IMAGE_ANALYSIS_CACHE_SIZE = 10_000
+
+# LLM decisions kept per exact decision prompt (retries, reprocessing of unchanged NFTs)
+EXACT_DECISION_CACHE_SIZE = 10_000
+EXACT_DECISION_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+# Similarity at or above which an NFT is flagged as a copy without asking the LLM
+DUPLICATE_SIMILARITY_THRESHOLD = 0.98
+
+# Image, similarity and metadata risks all below this allow an NFT without asking the LLM
+CLEAR_ALLOW_RISK_THRESHOLD = 0.1
+
+# Heuristic weights of the image, similarity and metadata risks when the LLM decision is unavailable
+FALLBACK_RISK_WEIGHTS = np.array([0.5, 0.3, 0.2])
+
+# (epoch second, ISO string) of the last analysis timestamp; see _now_iso
+_now_iso_cache = (0, "")
+
+
+def _now_iso() -> str:
+    """
+    Current local time as an ISO string at one-second resolution. Formatted at
+    most once per second; analyses finishing in the same second share the string.
+    """
+    global _now_iso_cache
+    second = int(time.time())
+    if second != _now_iso_cache[0]:
+        # Swapped as one tuple so a reader never sees a mismatched pair
+        _now_iso_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _now_iso_cache[1]
+
+
+# Truncating repr for log arguments; OutputParserException messages embed the
+# full LLM output
+_LOG_REPR = reprlib.Repr()
+_LOG_REPR.maxstring = 200
+_LOG_REPR.maxother = 200
+
+
+async def _stream_json(chain, inputs: Any) -> Tuple[Any, bool]:
+    """
+    Stream a prompt | llm | JsonOutputParser chain, parsing the JSON as tokens
+    arrive. Returns (parsed, complete): if the response is still streaming when
+    the timeout expires, the object parsed so far is returned with complete=False
+    instead of failing the whole step.
+    """
+    parsed = None
+    try:
+        async with asyncio.timeout(settings.gemini_response_timeout_seconds):
+            async for parsed in chain.astream(inputs):
+                pass
+    except TimeoutError:
+        if parsed is None:
+            raise
+        logger.warning(f"LLM response timed out after {settings.gemini_response_timeout_seconds}s, using partial result")
+        return parsed, False
+    
+    if parsed is None:
+        raise OutputParserException("LLM response contained no JSON")
+    return parsed, True
+
+
+# pgvector's built-in hnsw.ef_search; only a different value needs a SET
+PGVECTOR_DEFAULT_EF_SEARCH = 40
+
+
+async def _apply_hnsw_ef_search(conn) -> None:
+    """Set the HNSW candidate list size for the similarity queries on an acquired connection"""
+    await conn.execute(f"SET hnsw.ef_search = {int(settings.vector_ef_search)}")
+
+
+# Nearest neighbours by inner product (embeddings are unit-normalized, so
+# -(a <#> b) is the cosine similarity); served by the HNSW index on nfts
+SIMILARITY_SEARCH_SQL = """
+    SELECT 
+        id,
+        title,
+        image_url,
+        creator_wallet_address,
+        -(embedding_vector <#> $1) as similarity
+    FROM nfts 
+    WHERE embedding_vector IS NOT NULL 
+    ORDER BY embedding_vector <#> $1
+    LIMIT 10
+"""
+
+# SQLAlchemy form of the same query for the session fallback. Built once so its
+# compiled form is reused from the statement cache. For new NFTs, we don't have
+# a valid UUID yet, so we exclude the current_nft_id check
+SYNC_SIMILARITY_SEARCH_QUERY = text("""
+    SELECT 
+        id,
+        title,
+        image_url,
+        creator_wallet_address,
+        -(embedding_vector <#> :embedding) as similarity
+    FROM nfts 
+    WHERE embedding_vector IS NOT NULL 
+    ORDER BY embedding_vector <#> :embedding
+    LIMIT 10
+""").bindparams(bindparam("embedding", type_=Vector(EMBEDDING_DIMENSION) if Vector else None))
+
+# Static instruction blocks for the two text-only LLM steps. They are sent as the
+# system message, ahead of the per-NFT data, so every call shares an identical
+# leading prefix that Gemini's prompt caching can reuse.
+METADATA_SYSTEM_PROMPT = """
+Analyze the NFT metadata you are given for fraud indicators.
 
-@dataclass
+Look for:
+1. Low-quality or generic descriptions
+2. Suspicious keywords indicating fraud
+3. Price anomalies
+4. Inconsistencies in naming and description
+5. Reduce strictness for new or unverified creators
+6. Reduce strictness when indicating fraud
+
+Respond in JSON format:
+{
+    "quality_score": 0.0-1.0,
+    "suspicious_indicators": ["list of concerns"],
+    "metadata_risk": 0.0-1.0,
+    "analysis": "brief explanation"
+}
+"""
+
+DECISION_SYSTEM_PROMPT = """
+You are an expert NFT fraud detection AI. Based on comprehensive analysis, determine if this NFT is fraudulent.
+Consider the following guidelines:
+1. Be lenient with image-based fraud indicators unless there's strong evidence
+2. AI-generated art should not automatically be considered fraudulent
+3. Consider artistic interpretation and stylistic choices
+4. Focus more on exact duplicates rather than similar styles
+5. Give benefit of doubt to new creators
+
+Make a balanced fraud determination, being especially careful not to over-flag based on image analysis alone.
+Only flag as fraud if there is clear and convincing evidence, particularly for image-based concerns.
+
+Respond in JSON format:
+{
+    "is_fraud": true/false,
+    "confidence_score": 0.0-1.0,
+    "flag_type": 1-4 (1=plagiarism, 2=suspicious_activity, 3=fake_metadata, 4=ai_generated) or null,
+    "reason": "clear explanation of decision",
+    "primary_concerns": ["list of main issues"],
+    "recommendation": "ALLOW/FLAG/BLOCK"
+}
+"""
+
+# Per-NFT human message templates, filled in by the ChatPromptTemplates below
+METADATA_TEMPLATE = """
+NFT metadata:
+
+Name: {title}
+Description: {description}
+Category: {category}
+Price: {price}
+"""
+
+DECISION_TEMPLATE = """
+NFT Information:
+Name: {title}
+Description: {description}
+Category: {category}
+Price: {price}
+
+Analysis Results:
+
+Image Analysis:
+- Fraud Score: {image_fraud_score}
+- Risk Level: {image_risk_level}
+- Fraud Indicators: {image_fraud_indicators}
+
+Similarity Analysis:
+- Max Similarity: {max_similarity}
+- Similar NFTs Found: {similar_nft_count}
+- Is Duplicate: {is_duplicate}
+
+Metadata Analysis:
+- Quality Score: {quality_score}
+- Suspicious Indicators: {suspicious_indicators}
+- Metadata Risk: {metadata_risk}
+"""
+
+# Appended to a system prompt when several NFTs share one request
+BATCH_RESPONSE_INSTRUCTIONS = """
+You will receive several NFTs, each identified by an index.
+Respond with a JSON array containing one object in the format above per NFT,
+in the same order, and include each NFT's "index" in its object.
+"""
+
+
+@dataclass(slots=True)
 class NFTData:
     """NFT data structure for analysis"""
     title: str
@@ -45,7 +325,7 @@ class NFTData:
     price: float
 
 
-@dataclass
+@dataclass(slots=True)
 class FraudAnalysisResult:
     """Result of fraud analysis"""
     is_fraud: bool
@@ -56,6 +336,129 @@ class FraudAnalysisResult:
     details: Dict[str, Any]
 
 
+
+FRAUD_INDICATOR_TYPES = (
+    "low_effort_generation",
+    "stolen_artwork",
+    "ai_generated",
+    "template_usage",
+    "metadata_mismatch"
+)
+
+
+@dataclass(frozen=True)
+class FraudIndicatorResult:
+    """One fraud indicator of an image analysis"""
+    detected: bool = False
+    confidence: float = 0.0
+    evidence: str = ""
+
+
+@dataclass(frozen=True)
+class ImageAnalysisDefaults:
+    """Image analysis schema with defaults, used for placeholder results (convert with asdict)"""
+    description: str = ""
+    artistic_style: str = "unknown"
+    quality_assessment: str = ""
+    fraud_indicators: Dict[str, FraudIndicatorResult] = field(default_factory=dict)
+    overall_fraud_score: float = 0.0
+    risk_level: str = "unknown"
+    key_visual_elements: List[str] = field(default_factory=list)
+    color_palette: List[str] = field(default_factory=list)
+    composition_analysis: str = ""
+    uniqueness_score: float = 0.0
+    artistic_merit: str = ""
+    technical_quality: str = ""
+    market_value_assessment: str = ""
+    recommendation: str = ""
+    confidence_in_analysis: float = 0.0
+    additional_notes: str = ""
+
+
+def _placeholder_image_analysis(status: str, recommendation: str) -> ImageAnalysisDefaults:
+    """Placeholder analysis whose assessments and indicator evidence all read `status`"""
+    return ImageAnalysisDefaults(
+        quality_assessment=status,
+        fraud_indicators={name: FraudIndicatorResult(evidence=status) for name in FRAUD_INDICATOR_TYPES},
+        composition_analysis=status,
+        artistic_merit=status,
+        technical_quality=status,
+        market_value_assessment=status,
+        recommendation=recommendation
+    )
+
+
+UNAVAILABLE_IMAGE_ANALYSIS = _placeholder_image_analysis(
+    "Analysis not available", "Manual review required - Gemini analyzer not available"
+)
+FAILED_IMAGE_ANALYSIS = _placeholder_image_analysis(
+    "Analysis failed", "Manual review required - Analysis error"
+)
+
+
+class _LLMResult(BaseModel):
+    """Base for parsed LLM JSON: unknown keys are kept, invalid known fields fall back to their defaults"""
+    model_config = ConfigDict(extra="allow")
+    
+    @field_validator("*", mode="wrap")
+    @classmethod
+    def _default_if_invalid(cls, value, handler, info):
+        try:
+            return handler(value)
+        except ValidationError:
+            return cls.model_fields[info.field_name].get_default(call_default_factory=True)
+
+
+class MetadataAnalysis(_LLMResult):
+    """Metadata analysis returned by the LLM"""
+    quality_score: float = 0.5
+    suspicious_indicators: List[str] = []
+    metadata_risk: float = 0.1
+    analysis: str = ""
+
+
+# Recommendations (normalized to stripped upper case) that imply fraud
+_FLAG_RECOMMENDATIONS = frozenset({"FLAG", "BLOCK"})
+
+
+class FraudDecision(_LLMResult):
+    """Final fraud decision returned by the LLM"""
+    is_fraud: bool = False
+    confidence_score: float = 0.0
+    flag_type: Optional[int] = None
+    reason: str = "Analysis completed"
+    primary_concerns: List[str] = []
+    recommendation: str = ""
+    
+    @model_validator(mode="after")
+    def _fix_inconsistency(self):
+        # Fix logical inconsistency: if confidence is high and recommendation is FLAG, is_fraud should be true
+        recommendation = self.recommendation.strip().upper()
+        if self.confidence_score >= 0.7 and recommendation in _FLAG_RECOMMENDATIONS and not self.is_fraud:
+            self.is_fraud = True
+            logger.info(f"Fixed logical inconsistency: confidence={self.confidence_score}, recommendation={recommendation} -> is_fraud=True")
+        elif self.confidence_score < 0.3 and recommendation == "ALLOW" and self.is_fraud:
+            self.is_fraud = False
+            logger.info(f"Fixed logical inconsistency: confidence={self.confidence_score}, recommendation={recommendation} -> is_fraud=False")
+        return self
+
+
+# Fields a decision must state itself; FraudDecision defaults for them
+# (confidence 0.0, no recommendation) are not a verdict
+_REQUIRED_DECISION_FIELDS = frozenset({"confidence_score", "recommendation"})
+
+
+def _decision_from_llm(raw: Dict[str, Any], complete: bool) -> Dict[str, Any]:
+    """
+    Validate a parsed LLM decision. Decisions from a truncated stream, or missing
+    their verdict fields, are marked "incomplete": usable for this NFT, never cached
+    """
+    decision = FraudDecision.model_validate(raw).model_dump()
+    if not complete or not _REQUIRED_DECISION_FIELDS <= raw.keys():
+        decision["incomplete"] = True
+    return decision
+
+
 class UnifiedFraudDetector:
     """Unified fraud detection system using Google Gemini and LangGraph workflow"""
     
@@ -64,8 +467,109 @@ class UnifiedFraudDetector:
         self.gemini_analyzer = None
         self.supabase_client = None
         self.sui_client = None
+        self._pg_pool = None
+        self.vector_index = NFTVectorIndex()
+        self._image_analyses = LRUCache(maxsize=IMAGE_ANALYSIS_CACHE_SIZE)
+        self.decision_cache = SemanticDecisionCache()
+        self._exact_decisions = TTLCache(maxsize=EXACT_DECISION_CACHE_SIZE, ttl=EXACT_DECISION_CACHE_TTL_SECONDS)
+        # Compiled once; the static instructions go in as a literal system message
+        # so their JSON braces are not treated as template variables
+        if ChatPromptTemplate:
+            self._metadata_prompt = ChatPromptTemplate.from_messages([
+                SystemMessage(content=METADATA_SYSTEM_PROMPT),
+                ("human", METADATA_TEMPLATE)
+            ])
+            self._decision_prompt = ChatPromptTemplate.from_messages([
+                SystemMessage(content=DECISION_SYSTEM_PROMPT),
+                ("human", DECISION_TEMPLATE)
+            ])
+        # prompt -> LLM -> JSON chains, built with the LLM in initialize()
+        self._metadata_chain = None
+        self._decision_chain = None
+        self._batch_chain = None
+        # Group concurrent LLM steps into single multi-NFT requests
+        self._metadata_batcher = MicroBatcher(self._batch_analyze_metadata, batch_size=16, max_wait=0.02)
+        self._decision_batcher = MicroBatcher(self._batch_make_fraud_decisions, batch_size=16, max_wait=0.02)
+        # Concurrent in-process index lookups share one FAISS search; the window is
+        # short because the search itself takes well under a millisecond
+        self._similarity_batcher = MicroBatcher(self._batch_index_search, batch_size=64, max_wait=0.002)
         self.initialized = False
     
+    async def _init_vector_pool(self) -> None:
+        """Create the asyncpg pool used for vector similarity queries (if available)"""
+        if self._pg_pool or not asyncpg or not settings.supabase_db_url:
+            return
+        try:
+            # asyncpg takes a plain postgresql:// DSN, without a SQLAlchemy driver suffix
+            dsn = settings.supabase_db_url.replace("postgresql+psycopg2://", "postgresql://", 1)
+            self._pg_pool = await asyncpg.create_pool(
+                dsn,
+                min_size=settings.vector_pool_min_size,
+                max_size=settings.vector_pool_max_size,
+                init=register_asyncpg_vector,  # binary pgvector codec on every connection
+                # Pool release runs RESET ALL, so a non-default ef_search is re-applied per acquire
+                setup=_apply_hnsw_ef_search if settings.vector_ef_search != PGVECTOR_DEFAULT_EF_SEARCH else None
+            )
+            logger.info("Vector search connection pool initialized successfully")
+        except Exception as pool_error:
+            logger.warning(f"Failed to create vector search pool, using SQLAlchemy session instead: {pool_error}")
+            self._pg_pool = None
+    
+    async def _init_gemini_analyzer(self) -> None:
+        """Set up the Gemini image analyzer (None if unavailable)"""
+        try:
+            self.gemini_analyzer = await get_gemini_analyzer()
+            if self.gemini_analyzer:
+                await self.gemini_analyzer.initialize()
+                logger.info("Gemini analyzer initialized successfully")
+            else:
+                logger.warning("Gemini analyzer not available")
+        except Exception as analyzer_error:
+            logger.warning(f"Failed to initialize Gemini analyzer: {analyzer_error}")
+            self.gemini_analyzer = None
+    
+    async def _init_supabase_client(self) -> None:
+        """Set up the Supabase client (None if unavailable)"""
+        try:
+            self.supabase_client = await get_supabase_client()
+            if self.supabase_client:
+                await self.supabase_client.initialize()
+                logger.info("Supabase client initialized successfully")
+            else:
+                logger.warning("Supabase client not available")
+        except Exception as supabase_error:
+            logger.warning(f"Failed to initialize Supabase client: {supabase_error}")
+            self.supabase_client = None
+    
+    async def _init_vector_index(self) -> None:
+        """Build the in-process similarity index when faiss is installed"""
+        if not self.vector_index.available:
+            return
+        try:
+            await asyncio.to_thread(self.vector_index.build)
+        except Exception as index_error:
+            logger.warning(f"Failed to build in-process vector index, using database search: {index_error}")
+    
+    async def _init_sui_client(self) -> None:
+        """Set up the Sui client (None if unavailable)"""
+        try:
+            self.sui_client = await get_sui_client()
+            logger.info("Sui client initialized successfully")
+        except Exception as sui_error:
+            logger.warning(f"Failed to initialize Sui client: {sui_error}")
+            self.sui_client = None
+    
+    async def close(self) -> None:
+        """Release the vector search connection pool, image download client and LLM batchers"""
+        await self._metadata_batcher.close()
+        await self._decision_batcher.close()
+        await self._similarity_batcher.close()
+        if self.gemini_analyzer:
+            await self.gemini_analyzer.close()
+        if self._pg_pool:
+            await self._pg_pool.close()
+            self._pg_pool = None
+    
     async def initialize(self) -> bool:
         """Initialize all fraud detection components"""
         try:
@@ -77,42 +581,29 @@ class UnifiedFraudDetector:
                     self.llm = ChatGoogleGenerativeAI(
                         model=settings.google_model,
                         temperature=0.1,
-                        google_api_key=settings.google_api_key
+                        google_api_key=settings.google_api_key,
+                        max_retries=0  # retried by call_gemini, outside the concurrency cap
                     )
+                    # JsonOutputParser handles markdown fences and partial JSON;
+                    # the Pydantic models then validate the parsed objects
+                    self._metadata_chain = self._metadata_prompt | self.llm | JsonOutputParser(pydantic_object=MetadataAnalysis)
+                    self._decision_chain = self._decision_prompt | self.llm | JsonOutputParser(pydantic_object=FraudDecision)
+                    self._batch_chain = self.llm | JsonOutputParser()
                     logger.info("Google Gemini LLM initialized successfully")
                 except Exception as llm_error:
                     logger.warning(f"Failed to initialize Gemini LLM: {llm_error}")
                     self.llm = None
             
-            # Initialize other components with better error handling
-            try:
-                self.gemini_analyzer = await get_gemini_analyzer()
-                if self.gemini_analyzer:
-                    await self.gemini_analyzer.initialize()
-                    logger.info("Gemini analyzer initialized successfully")
-                else:
-                    logger.warning("Gemini analyzer not available")
-            except Exception as analyzer_error:
-                logger.warning(f"Failed to initialize Gemini analyzer: {analyzer_error}")
-                self.gemini_analyzer = None
-            
-            try:
-                self.supabase_client = await get_supabase_client()
-                if self.supabase_client:
-                    await self.supabase_client.initialize()
-                    logger.info("Supabase client initialized successfully")
-                else:
-                    logger.warning("Supabase client not available")
-            except Exception as supabase_error:
-                logger.warning(f"Failed to initialize Supabase client: {supabase_error}")
-                self.supabase_client = None
-            
-            try:
-                self.sui_client = await get_sui_client()
-                logger.info("Sui client initialized successfully")
-            except Exception as sui_error:
-                logger.warning(f"Failed to initialize Sui client: {sui_error}")
-                self.sui_client = None
+            # The remaining components are independent, so start them concurrently;
+            # each one handles and logs its own failure
+            await asyncio.gather(
+                self._init_gemini_analyzer(),
+                self._init_supabase_client(),
+                self._init_vector_pool(),
+                self._init_vector_index(),
+                self._init_sui_client(),
+                return_exceptions=True
+            )
             
             # Mark as initialized even if some components failed
             self.initialized = True
@@ -125,12 +616,13 @@ class UnifiedFraudDetector:
             self.initialized = True
             return False
     
-    async def analyze_nft_for_fraud(self, nft_data: NFTData) -> Dict[str, Any]:
+    async def analyze_nft_for_fraud(self, nft_data: NFTData, nft_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Comprehensive NFT fraud analysis using LLM
         
         Args:
             nft_data: NFT data to analyze
+            nft_id: ID of an already stored NFT, excluded from its own similarity matches
             
         Returns:
             Dict with fraud analysis results
@@ -141,23 +633,35 @@ class UnifiedFraudDetector:
             
             logger.info(f"Starting comprehensive fraud analysis for NFT: {nft_data.title}")
             
-            # Step 1: Image Analysis with Gemini
-            image_analysis = await self._analyze_image_with_gemini(nft_data)
-            logger.info(f"Image analysis keys: {list(image_analysis.keys())}")
-            logger.info(f"Embedding in image analysis: {image_analysis.get('embedding') is not None}")
-            if image_analysis.get('embedding'):
-                logger.info(f"Embedding dimension: {len(image_analysis['embedding'])}")
+            # Steps 1 and 3 are independent Gemini calls, so run them concurrently;
+            # similarity search needs the image embedding and the decision needs everything
+            image_analysis, metadata_analysis = await asyncio.gather(
+                self._analyze_image_with_gemini(nft_data),
+                self._analyze_metadata(nft_data),
+                return_exceptions=True
+            )
+            if isinstance(image_analysis, Exception):
+                logger.error(f"Error in image analysis: {image_analysis}")
+                image_analysis = self._image_analysis_error_result(nft_data, image_analysis)
+            if isinstance(metadata_analysis, Exception):
+                logger.error(f"Error in metadata analysis: {metadata_analysis}")
+                metadata_analysis = self._metadata_error_result(metadata_analysis)
             
-            # Step 2: Description Embedding and Similarity Search
-            similarity_results = await self._check_similarity(nft_data, image_analysis)
+            # Diagnostics only; skipped entirely unless DEBUG is enabled
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Image analysis keys: %s", list(image_analysis.keys()))
+                logger.debug("Embedding dimension: %d", len(image_analysis.get('embedding') or []))
             
-            # Step 3: Metadata Analysis
-            metadata_analysis = await self._analyze_metadata(nft_data)
+            # Step 2: Description Embedding and Similarity Search
+            similarity_results = await self._check_similarity(nft_data, image_analysis, nft_id)
             
-            # Step 4: LLM-based Final Fraud Decision
-            fraud_decision = await self._make_llm_fraud_decision(
-                nft_data, image_analysis, similarity_results, metadata_analysis
-            )
+            # Step 4: LLM-based Final Fraud Decision, unless the evidence is
+            # already conclusive either way
+            fraud_decision = self._deterministic_fraud_decision(image_analysis, similarity_results, metadata_analysis)
+            if fraud_decision is None:
+                fraud_decision = await self._make_llm_fraud_decision(
+                    nft_data, image_analysis, similarity_results, metadata_analysis
+                )
             
             # Prepare comprehensive result with detailed image analysis
             result = {
@@ -167,29 +671,14 @@ class UnifiedFraudDetector:
                 "reason": fraud_decision.get("reason", "Analysis completed"),
                 "analysis_details": {
                     "image_analysis": {
-                        "description": image_analysis.get("description", ""),
-                        "artistic_style": image_analysis.get("artistic_style", ""),
-                        "quality_assessment": image_analysis.get("quality_assessment", ""),
-                        "fraud_indicators": image_analysis.get("fraud_indicators", {}),
-                        "overall_fraud_score": image_analysis.get("overall_fraud_score", 0.0),
-                        "risk_level": image_analysis.get("risk_level", "unknown"),
-                        "key_visual_elements": image_analysis.get("key_visual_elements", []),
-                        "color_palette": image_analysis.get("color_palette", []),
-                        "composition_analysis": image_analysis.get("composition_analysis", ""),
-                        "uniqueness_score": image_analysis.get("uniqueness_score", 0.0),
-                        "artistic_merit": image_analysis.get("artistic_merit", ""),
-                        "technical_quality": image_analysis.get("technical_quality", ""),
-                        "market_value_assessment": image_analysis.get("market_value_assessment", ""),
-                        "recommendation": image_analysis.get("recommendation", ""),
-                        "confidence_in_analysis": image_analysis.get("confidence_in_analysis", 0.0),
-                        "additional_notes": image_analysis.get("additional_notes", ""),
-                        "embedding": image_analysis.get("embedding", []),
-                        "embedding_dimension": image_analysis.get("embedding_dimension", 0)
+                        # Copy defaults so no result shares the template's lists/dicts
+                        key: image_analysis[key] if key in image_analysis else copy.copy(default)
+                        for key, default in _IMAGE_ANALYSIS_DETAIL_DEFAULTS.items()
                     },
                     "similarity_results": similarity_results,
                     "metadata_analysis": metadata_analysis,
                     "llm_decision": fraud_decision,
-                    "analysis_timestamp": datetime.now().isoformat()
+                    "analysis_timestamp": _now_iso()
                 }
             }
             
@@ -198,40 +687,67 @@ class UnifiedFraudDetector:
             
         except Exception as e:
             logger.error(f"Error in fraud analysis: {e}")
+            error = str(e)
+            image_details = orjson.loads(_EMPTY_IMAGE_ANALYSIS_JSON)
+            image_details["description"] = f"Error analyzing image: {error}"
+            image_details["additional_notes"] = f"Error: {error}"
             return {
                 "is_fraud": False,
                 "confidence_score": 0.0,
                 "flag_type": None,
-                "reason": f"Analysis error: {str(e)}",
+                "reason": f"Analysis error: {error}",
                 "analysis_details": {
-                    "image_analysis": {
-                        "description": f"Error analyzing image: {str(e)}",
-                        "artistic_style": "unknown",
-                        "quality_assessment": "Analysis failed",
-                        "fraud_indicators": {},
-                        "overall_fraud_score": 0.0,
-                        "risk_level": "unknown",
-                        "key_visual_elements": [],
-                        "color_palette": [],
-                        "composition_analysis": "Analysis failed",
-                        "uniqueness_score": 0.0,
-                        "artistic_merit": "Analysis failed",
-                        "technical_quality": "Analysis failed",
-                        "market_value_assessment": "Analysis failed",
-                        "recommendation": "Manual review required",
-                        "confidence_in_analysis": 0.0,
-                        "additional_notes": f"Error: {str(e)}",
-                        "embedding": [],
-                        "embedding_dimension": 0
-                    },
-                    "similarity_results": {"error": str(e)},
-                    "metadata_analysis": {"error": str(e)},
-                    "llm_decision": {"error": str(e)},
-                    "analysis_timestamp": datetime.now().isoformat(),
-                    "error": str(e)
+                    "image_analysis": image_details,
+                    "similarity_results": {"error": error},
+                    "metadata_analysis": {"error": error},
+                    "llm_decision": {"error": error},
+                    "analysis_timestamp": _now_iso(),
+                    "error": error
                 }
             }
     
+    def _deterministic_fraud_decision(
+        self,
+        image_analysis: Dict[str, Any],
+        similarity_results: Dict[str, Any],
+        metadata_analysis: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Decision for clear-cut cases that need no LLM tiebreak, or None to ask the LLM"""
+        max_similarity = similarity_results.get("max_similarity", 0.0)
+        if max_similarity >= DUPLICATE_SIMILARITY_THRESHOLD:
+            logger.info(f"Near-exact duplicate (similarity {max_similarity:.3f}), skipping LLM decision")
+            return {
+                "is_fraud": True,
+                "confidence_score": max_similarity,
+                "flag_type": 1,  # plagiarism
+                "reason": f"Near-exact duplicate of an existing NFT (similarity {max_similarity:.3f})",
+                "primary_concerns": ["Duplicate of existing NFT"],
+                "recommendation": "BLOCK",
+                "short_circuited": True
+            }
+        
+        # Clean on every signal. Requires a completed image analysis (it produced an
+        # embedding) and similarity/metadata steps without errors, so failed steps,
+        # whose placeholder scores are low, still go to the LLM. There is no image-only
+        # counterpart for BLOCK: the decision prompt forbids flagging on image evidence alone
+        image_risk = image_analysis.get("overall_fraud_score", 0.0)
+        metadata_risk = metadata_analysis.get("metadata_risk", 0.0)
+        if (image_analysis.get("embedding") and "error" not in similarity_results
+                and "error" not in metadata_analysis
+                and not metadata_analysis.get("suspicious_indicators")
+                and max(image_risk, max_similarity, metadata_risk) < CLEAR_ALLOW_RISK_THRESHOLD):
+            logger.info("All fraud signals below threshold, skipping LLM decision")
+            return {
+                "is_fraud": False,
+                "confidence_score": max(image_risk, max_similarity, metadata_risk),
+                "flag_type": None,
+                "reason": "No fraud indicators: image, similarity and metadata risks are all negligible",
+                "primary_concerns": [],
+                "recommendation": "ALLOW",
+                "short_circuited": True
+            }
+        return None
+    
     async def _analyze_image_with_gemini(self, nft_data: NFTData) -> Dict[str, Any]:
         """Step 1: Analyze image using Gemini Vision"""
         try:
@@ -244,106 +760,49 @@ class UnifiedFraudDetector:
                     "category": nft_data.category
                 }
                 
-                analysis = await self.gemini_analyzer.analyze_nft_image(
-                    nft_data.image_url, 
-                    nft_metadata
-                )
-                return analysis
+                # Re-listings and rescans repeat the same image; the metadata is part of
+                # the key because the analysis also judges image/metadata mismatch
+                cache_key = hashlib.blake2b(
+                    orjson.dumps([nft_data.image_url, nft_metadata], default=str, option=orjson.OPT_SORT_KEYS),
+                    digest_size=16
+                ).digest()
+                cached = self._image_analyses.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Using cached image analysis for: {nft_data.image_url}")
+                    return dict(cached)
+                
+                # The analyzer gates each of its Gemini requests itself
+                analysis = await self.gemini_analyzer.analyze_nft_image(nft_data.image_url, nft_metadata)
+                # Failed analyses come back without an embedding; don't pin those
+                if analysis.get("embedding"):
+                    self._image_analyses[cache_key] = analysis
+                return dict(analysis)
             
             # Fallback if gemini analyzer not available
             return {
+                **asdict(UNAVAILABLE_IMAGE_ANALYSIS),
                 "description": f"Image analysis for {nft_data.title} - Gemini analyzer not available",
-                "artistic_style": "unknown",
-                "quality_assessment": "Analysis not available",
-                "fraud_indicators": {
-                    "low_effort_generation": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis not available"
-                    },
-                    "stolen_artwork": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis not available"
-                    },
-                    "ai_generated": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis not available"
-                    },
-                    "template_usage": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis not available"
-                    },
-                    "metadata_mismatch": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis not available"
-                    }
-                },
-                "overall_fraud_score": 0.0,
-                "risk_level": "unknown",
-                "key_visual_elements": [],
-                "color_palette": [],
-                "composition_analysis": "Analysis not available",
-                "uniqueness_score": 0.0,
-                "artistic_merit": "Analysis not available",
-                "technical_quality": "Analysis not available",
-                "market_value_assessment": "Analysis not available",
-                "recommendation": "Manual review required - Gemini analyzer not available",
-                "confidence_in_analysis": 0.0,
                 "additional_notes": "Gemini analyzer not available for detailed image analysis"
             }
             
         except Exception as e:
             logger.error(f"Error in image analysis: {e}")
-            return {
-                "description": f"Error analyzing {nft_data.title}",
-                "artistic_style": "unknown",
-                "quality_assessment": "Analysis failed",
-                "fraud_indicators": {
-                    "low_effort_generation": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "stolen_artwork": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "ai_generated": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "template_usage": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "metadata_mismatch": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    }
-                },
-                "overall_fraud_score": 0.0,
-                "risk_level": "unknown",
-                "key_visual_elements": [],
-                "color_palette": [],
-                "composition_analysis": "Analysis failed",
-                "uniqueness_score": 0.0,
-                "artistic_merit": "Analysis failed",
-                "technical_quality": "Analysis failed",
-                "market_value_assessment": "Analysis failed",
-                "recommendation": "Manual review required - Analysis error",
-                "confidence_in_analysis": 0.0,
-                "additional_notes": f"Error: {str(e)}"
-            }
+            return self._image_analysis_error_result(nft_data, e)
+    
+    def _image_analysis_error_result(self, nft_data: NFTData, error: Exception) -> Dict[str, Any]:
+        """Image analysis placeholder used when the Gemini image step fails"""
+        return {
+            **asdict(FAILED_IMAGE_ANALYSIS),
+            "description": f"Error analyzing {nft_data.title}",
+            "additional_notes": f"Error: {str(error)}"
+        }
     
-    async def _check_similarity(self, nft_data: NFTData, image_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    async def _check_similarity(
+        self,
+        nft_data: NFTData,
+        image_analysis: Dict[str, Any],
+        nft_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """Step 2: Check for similar NFTs using embeddings and store evidence URLs"""
         try:
             # Get embedding from image analysis
@@ -358,90 +817,24 @@ class UnifiedFraudDetector:
                     "evidence_urls": []
                 }
             
-            # Import database session for similarity search
-            try:
-                from database.connection import get_db
-                from sqlalchemy.orm import Session
-                from sqlalchemy import text
-                import numpy as np
-            except ImportError:
-                logger.warning("Database dependencies not available for similarity search")
-                return {
-                    "similar_nfts": [],
-                    "max_similarity": 0.0,
-                    "is_duplicate": False,
-                    "similarity_count": 0,
-                    "evidence_urls": []
-                }
-            
-            # Get database session
-            try:
-                from database.connection import get_db
-            except ImportError:
-                from backend.database.connection import get_db
-            db_gen = get_db()
-            db = next(db_gen)
+            embedding_array = np.asarray(embedding, dtype=np.float32)
             
             try:
-                # Search for similar NFTs using vector similarity
-                # Use PostgreSQL's vector similarity search on the embedding_vector column
-                # For new NFTs, we don't have a valid UUID yet, so we exclude the current_nft_id check
-                query = text("""
-                    SELECT 
-                        id,
-                        title,
-                        image_url,
-                        creator_wallet_address,
-                        embedding_vector <=> :embedding as distance
-                    FROM nfts 
-                    WHERE embedding_vector IS NOT NULL 
-                    ORDER BY embedding_vector <=> :embedding
-                    LIMIT 10
-                """)
-                
-                # Convert embedding to PostgreSQL vector format
-                embedding_str = f"[{','.join(map(str, embedding))}]"
-                
-                result = db.execute(query, {
-                    "embedding": embedding_str
-                })
-                
-                similar_nfts = []
-                evidence_urls = []
-                max_similarity = 0.0
-                
-                for row in result:
-                    # Convert distance to similarity (1 - distance)
-                    distance = float(row.distance)
-                    similarity = 1.0 - distance
-                    
-                    if similarity >= 0.7:  # Threshold for similar NFTs
-                        similar_nft = {
-                            "nft_id": str(row.id),
-                            "metadata": {
-                                "name": row.title,
-                                "creator": row.creator_wallet_address,
-                                "image_url": row.image_url
-                            },
-                            "similarity": similarity
-                        }
-                        similar_nfts.append(similar_nft)
-                        evidence_urls.append(row.image_url)
-                        max_similarity = max(max_similarity, similarity)
-                
-                # Determine if this is a duplicate based on high similarity
-                is_duplicate = max_similarity > 0.95
-                
-                logger.info(f"Found {len(similar_nfts)} similar NFTs, max similarity: {max_similarity:.3f}")
-                
-                return {
-                    "similar_nfts": similar_nfts,
-                    "max_similarity": max_similarity,
-                    "is_duplicate": is_duplicate,
-                    "similarity_count": len(similar_nfts),
-                    "evidence_urls": evidence_urls
-                }
-                
+                # In-process HNSW index first; the database serves lookups until it is built
+                rows = None
+                if self.vector_index.ready and embedding_array.shape == (self.vector_index.dimension,):
+                    rows = await self._similarity_batcher.submit(embedding_array)
+                if rows is None:
+                    if self._pg_pool:
+                        # asyncpg yields to the event loop during the round-trip, so
+                        # concurrent analyses are not serialized behind one blocking query
+                        async with self._pg_pool.acquire() as conn:
+                            # asyncpg prepares the statement on first use per connection and
+                            # reuses it from its statement cache after that
+                            rows = await conn.fetch(SIMILARITY_SEARCH_SQL, embedding_array)
+                    else:
+                        # Blocking session work runs in the default executor
+                        rows = await asyncio.to_thread(self._sync_similarity_search, embedding_array)
             except Exception as db_error:
                 logger.error(f"Database similarity search error: {db_error}")
                 # Return empty results when database search fails
@@ -453,8 +846,47 @@ class UnifiedFraudDetector:
                     "evidence_urls": [],
                     "error": f"Database search failed: {str(db_error)}"
                 }
-            finally:
-                db.close()
+            
+            if nft_id is not None:
+                # A re-analysed NFT is already stored and indexed, and would match
+                # itself at ~1.0 and be blocked as its own duplicate
+                rows = [row for row in rows if str(row["id"]) != str(nft_id)]
+            
+            # Score filtering and ordering are vectorized; Python dicts are only
+            # built for the few matches that are returned
+            similarities = np.fromiter((row["similarity"] for row in rows), dtype=np.float64, count=len(rows))
+            matches = np.flatnonzero(similarities >= 0.7)  # Threshold for similar NFTs
+            similarity_count = int(matches.size)
+            max_similarity = float(similarities[matches].max()) if similarity_count else 0.0
+            
+            # Determine if this is a duplicate based on high similarity
+            is_duplicate = max_similarity > 0.95
+            
+            # Only the closest matches carry signal; the rest would just grow the decision prompt
+            top_matches = matches[np.argsort(-similarities[matches], kind="stable")][:TOP_SIMILAR_NFTS]
+            similar_nfts = [
+                {
+                    "nft_id": str(rows[i]["id"]),
+                    "metadata": {
+                        "name": rows[i]["title"],
+                        "creator": rows[i]["creator_wallet_address"],
+                        "image_url": rows[i]["image_url"]
+                    },
+                    "similarity": float(similarities[i])
+                }
+                for i in top_matches
+            ]
+            evidence_urls = [nft["metadata"]["image_url"] for nft in similar_nfts]
+            
+            logger.info(f"Found {similarity_count} similar NFTs, max similarity: {max_similarity:.3f}")
+            
+            return {
+                "similar_nfts": similar_nfts,
+                "max_similarity": max_similarity,
+                "is_duplicate": is_duplicate,
+                "similarity_count": similarity_count,
+                "evidence_urls": evidence_urls
+            }
             
         except Exception as e:
             logger.error(f"Error in similarity check: {e}")
@@ -467,6 +899,21 @@ class UnifiedFraudDetector:
                 "error": str(e)
             }
     
+    async def _batch_index_search(self, embeddings: List[np.ndarray]) -> List[Optional[List[Dict[str, Any]]]]:
+        """Nearest NFTs for several query embeddings with one index search, run off the event loop"""
+        results = await asyncio.to_thread(self.vector_index.search_many, np.stack(embeddings))
+        return results if results is not None else [None] * len(embeddings)
+    
+    def _sync_similarity_search(self, embedding_array: np.ndarray) -> List[Dict[str, Any]]:
+        """Similarity search over the SQLAlchemy session, used when the asyncpg pool is unavailable"""
+        db_gen = get_db()
+        db = next(db_gen)
+        try:
+            result = db.execute(SYNC_SIMILARITY_SEARCH_QUERY, {"embedding": embedding_array})
+            return [row._mapping for row in result]
+        finally:
+            db.close()
+    
     async def _analyze_metadata(self, nft_data: NFTData) -> Dict[str, Any]:
         """Step 3: Analyze NFT metadata for fraud indicators"""
         try:
@@ -478,98 +925,99 @@ class UnifiedFraudDetector:
                     "metadata_risk": 0.1
                 }
             
-            # Use LLM to analyze metadata
-            metadata_prompt = f"""
-            Analyze this NFT metadata for fraud indicators:
-            
-            Name: {nft_data.title}
-            Description: {nft_data.description}
-            Category: {nft_data.category}
-            Price: {nft_data.price}
-            
-            Look for:
-            1. Low-quality or generic descriptions
-            2. Suspicious keywords indicating fraud
-            3. Price anomalies
-            4. Inconsistencies in naming and description
-            5. Reduce strictness for new or unverified creators
-            6. Reduce strictness when indicating fraud
-            
-            Respond in JSON format:
-            {{
-                "quality_score": 0.0-1.0,
-                "suspicious_indicators": ["list of concerns"],
-                "metadata_risk": 0.0-1.0,
-                "analysis": "brief explanation"
-            }}
-            """
-            
-            response = await self.llm.ainvoke(metadata_prompt)
-            logger.info("=" * 80)
-            logger.info("LLM METADATA ANALYSIS RESPONSE:")
-            logger.info("=" * 80)
-            logger.info(response.content)
-            logger.info("=" * 80)
-            
-            try:
-                import json
-                
-                # Clean and extract JSON from response
-                response_text = response.content.strip()
-                
-                # If response is empty or contains only whitespace
-                if not response_text:
-                    logger.warning("LLM returned empty response for metadata analysis")
-                    return {
-                        "quality_score": 0.5,
-                        "suspicious_indicators": ["Empty LLM response"],
-                        "metadata_risk": 0.2,
-                        "analysis": "Fallback analysis used due to empty response"
-                    }
-                
-                # Try to extract JSON from markdown code blocks if present
-                if "```json" in response_text:
-                    json_start = response_text.find("```json") + 7
-                    json_end = response_text.find("```", json_start)
-                    if json_end != -1:
-                        response_text = response_text[json_start:json_end].strip()
-                elif "```" in response_text:
-                    json_start = response_text.find("```") + 3
-                    json_end = response_text.find("```", json_start)
-                    if json_end != -1:
-                        response_text = response_text[json_start:json_end].strip()
-                
-                metadata_analysis = json.loads(response_text)
-                
-                # Validate the response
-                if not isinstance(metadata_analysis.get("quality_score"), (int, float)):
-                    metadata_analysis["quality_score"] = 0.5
-                if not isinstance(metadata_analysis.get("metadata_risk"), (int, float)):
-                    metadata_analysis["metadata_risk"] = 0.1
-                if not isinstance(metadata_analysis.get("suspicious_indicators"), list):
-                    metadata_analysis["suspicious_indicators"] = []
-                
-                return metadata_analysis
-                
-            except Exception as parse_error:
-                logger.warning(f"Failed to parse LLM metadata response: {parse_error}")
-                logger.warning(f"Raw metadata response: {response.content[:200] if hasattr(response, 'content') else 'No content'}")
-                # Fallback if JSON parsing fails
-                return {
-                    "quality_score": 0.5,
-                    "suspicious_indicators": ["LLM response parsing failed"],
-                    "metadata_risk": 0.2,
-                    "analysis": "Fallback analysis used due to parsing error"
-                }
+            # Concurrent analyses are grouped into one Gemini request by the batcher
+            return await self._metadata_batcher.submit(nft_data)
             
         except Exception as e:
             logger.error(f"Error in metadata analysis: {e}")
+            return self._metadata_error_result(e)
+    
+    async def _batch_analyze_metadata(self, items: List[NFTData]) -> List[Dict[str, Any]]:
+        """Analyze the metadata of several NFTs with a single LLM call"""
+        if len(items) == 1:
+            return [await self._analyze_metadata_single(items[0])]
+        
+        metadata_prompt = orjson.dumps([
+            {
+                "index": i,
+                "name": nft_data.title,
+                "description": nft_data.description,
+                "category": nft_data.category,
+                "price": nft_data.price
+            }
+            for i, nft_data in enumerate(items)
+        ], default=str, option=orjson.OPT_INDENT_2).decode()
+        
+        analyses, _ = await self._invoke_batch_chain([
+            SystemMessage(content=METADATA_SYSTEM_PROMPT + BATCH_RESPONSE_INSTRUCTIONS),
+            HumanMessage(content=metadata_prompt)
+        ], len(items))
+        if analyses is None:
+            # Malformed batch response: retry each NFT on its own
+            logger.warning(f"Falling back to per-NFT metadata analysis for {len(items)} NFTs")
+            return list(await asyncio.gather(*(self._analyze_metadata_single(nft_data) for nft_data in items)))
+        
+        return [MetadataAnalysis.model_validate(analysis).model_dump() for analysis in analyses]
+    
+    async def _analyze_metadata_single(self, nft_data: NFTData) -> Dict[str, Any]:
+        """Analyze one NFT's metadata with its own LLM call"""
+        try:
+            parsed, _ = await call_gemini(_stream_json, self._metadata_chain, {
+                "title": nft_data.title,
+                "description": nft_data.description,
+                "category": nft_data.category,
+                "price": nft_data.price
+            })
+            metadata_analysis = MetadataAnalysis.model_validate(parsed).model_dump()
+            logger.debug("LLM metadata analysis: %s", metadata_analysis)
+            return metadata_analysis
+            
+        except (OutputParserException, ValidationError) as parse_error:
+            logger.warning("Failed to parse LLM metadata response: %s", _LOG_REPR.repr(parse_error))
+            # Fallback if JSON parsing fails
             return {
                 "quality_score": 0.5,
-                "suspicious_indicators": [f"Analysis error: {str(e)}"],
-                "metadata_risk": 0.1,
-                "error": str(e)
+                "suspicious_indicators": ["LLM response parsing failed"],
+                "metadata_risk": 0.2,
+                "analysis": "Fallback analysis used due to parsing error"
             }
+        except Exception as e:
+            logger.error(f"Error in metadata analysis: {e}")
+            return self._metadata_error_result(e)
+    
+    def _metadata_error_result(self, error: Exception) -> Dict[str, Any]:
+        """Metadata analysis placeholder used when the metadata step fails"""
+        return {
+            "quality_score": 0.5,
+            "suspicious_indicators": [f"Analysis error: {str(error)}"],
+            "metadata_risk": 0.1,
+            "error": str(error)
+        }
+    
+    async def _invoke_batch_chain(self, messages: List[Any], expected: int) -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+        """
+        Run a batched prompt and return (one parsed object per input, or None if the
+        response is unusable; whether the response streamed to completion)
+        """
+        try:
+            parsed, complete = await call_gemini(_stream_json, self._batch_chain, messages)
+        except OutputParserException as parse_error:
+            logger.warning("Failed to parse batched LLM response: %s", _LOG_REPR.repr(parse_error))
+            return None, False
+        logger.info(f"LLM batched response for {expected} NFTs")
+        
+        if not isinstance(parsed, list) or len(parsed) != expected:
+            logger.warning(f"Batched LLM response has wrong shape (expected {expected} objects)")
+            return None, complete
+        if not all(isinstance(entry, dict) for entry in parsed):
+            return None, complete
+        
+        # Restore input order when the model echoes indices back
+        if all(isinstance(entry.get("index"), int) for entry in parsed):
+            parsed = sorted(parsed, key=lambda entry: entry["index"])
+            if [entry["index"] for entry in parsed] != list(range(expected)):
+                return None, complete
+        return parsed, complete
     
     async def _make_llm_fraud_decision(
         self, 
@@ -600,112 +1048,52 @@ class UnifiedFraudDetector:
                     }
                 }
             
-            # Use LLM for final decision
-            decision_prompt = f"""
-            You are an expert NFT fraud detection AI. Based on comprehensive analysis, determine if this NFT is fraudulent.
-            Consider the following guidelines:
-            1. Be lenient with image-based fraud indicators unless there's strong evidence
-            2. AI-generated art should not automatically be considered fraudulent
-            3. Consider artistic interpretation and stylistic choices
-            4. Focus more on exact duplicates rather than similar styles
-            5. Give benefit of doubt to new creators
-            
-            NFT Information:
-            Name: {nft_data.title}
-            Description: {nft_data.description}
-            Category: {nft_data.category}
-            Price: {nft_data.price}
-            
-            Analysis Results:
-            
-            Image Analysis:
-            - Fraud Score: {image_analysis.get('overall_fraud_score', 0.0)}
-            - Risk Level: {image_analysis.get('risk_level', 'unknown')}
-            - Fraud Indicators: {image_analysis.get('fraud_indicators', {})}
-            
-            Similarity Analysis:
-            - Max Similarity: {similarity_results.get('max_similarity', 0.0)}
-            - Similar NFTs Found: {len(similarity_results.get('similar_nfts', []))}
-            - Is Duplicate: {similarity_results.get('is_duplicate', False)}
-            
-            Metadata Analysis:
-            - Quality Score: {metadata_analysis.get('quality_score', 0.0)}
-            - Suspicious Indicators: {metadata_analysis.get('suspicious_indicators', [])}
-            - Metadata Risk: {metadata_analysis.get('metadata_risk', 0.0)}
-            
-            Make a balanced fraud determination, being especially careful not to over-flag based on image analysis alone.
-            Only flag as fraud if there is clear and convincing evidence, particularly for image-based concerns.
-            
-            Respond in JSON format:
-            {{
-                "is_fraud": true/false,
-                "confidence_score": 0.0-1.0,
-                "flag_type": 1-4 (1=plagiarism, 2=suspicious_activity, 3=fake_metadata, 4=ai_generated) or null,
-                "reason": "clear explanation of decision",
-                "primary_concerns": ["list of main issues"],
-                "recommendation": "ALLOW/FLAG/BLOCK"
-            }}
-            """
-            
-            response = await self.llm.ainvoke(decision_prompt)
-            logger.info("=" * 80)
-            logger.info("LLM FRAUD DECISION RESPONSE:")
-            logger.info("=" * 80)
-            logger.info(response.content)
-            logger.info("=" * 80)
-            try:
-                import json
-                
-                # Clean and extract JSON from response
-                response_text = response.content.strip()
-                logger.info(f"LLM raw response: {response_text[:500]}...")  # Log first 500 chars
-                
-                # If response is empty or contains only whitespace
-                if not response_text:
-                    logger.warning("LLM returned empty response")
-                    return self._get_safe_fallback_decision(nft_data, image_analysis, similarity_results, metadata_analysis)
-                
-                # Try to extract JSON from markdown code blocks if present
-                if "```json" in response_text:
-                    json_start = response_text.find("```json") + 7
-                    json_end = response_text.find("```", json_start)
-                    if json_end != -1:
-                        response_text = response_text[json_start:json_end].strip()
-                elif "```" in response_text:
-                    json_start = response_text.find("```") + 3
-                    json_end = response_text.find("```", json_start)
-                    if json_end != -1:
-                        response_text = response_text[json_start:json_end].strip()
-                
-                fraud_decision = json.loads(response_text)
-                
-                # Validate the response and ensure logical consistency
-                if not isinstance(fraud_decision.get("is_fraud"), bool):
-                    fraud_decision["is_fraud"] = False
-                if not isinstance(fraud_decision.get("confidence_score"), (int, float)):
-                    fraud_decision["confidence_score"] = 0.0
-                
-                # Fix logical inconsistency: if confidence is high and recommendation is FLAG, is_fraud should be true
-                confidence_score = fraud_decision.get("confidence_score", 0.0)
-                recommendation = fraud_decision.get("recommendation", "").upper()
-                
-                if confidence_score >= 0.7 and recommendation in ["FLAG", "BLOCK"]:
-                    fraud_decision["is_fraud"] = True
-                    logger.info(f"Fixed logical inconsistency: confidence={confidence_score}, recommendation={recommendation} -> is_fraud=True")
-                elif confidence_score < 0.3 and recommendation == "ALLOW":
-                    fraud_decision["is_fraud"] = False
-                    logger.info(f"Fixed logical inconsistency: confidence={confidence_score}, recommendation={recommendation} -> is_fraud=False")
-                
+            # Byte-identical decision prompt: reuse the earlier answer outright. The
+            # template is fixed, so hashing its inputs is hashing the prompt
+            prompt_key = hashlib.blake2b(
+                orjson.dumps(
+                    self._decision_inputs(nft_data, image_analysis, similarity_results, metadata_analysis),
+                    default=str,
+                    option=orjson.OPT_SORT_KEYS
+                ),
+                digest_size=16
+            ).digest()
+            cached = self._exact_decisions.get(prompt_key)
+            if cached is not None:
+                logger.info("Exact decision cache hit")
+                return {**cached, "cache_hit": True}
+            
+            # Same metadata and a near-identical image: reuse the earlier decision
+            embedding = image_analysis.get("embedding")
+            meta_hash = metadata_hash((
+                nft_data.title,
+                nft_data.description,
+                nft_data.category,
+                getattr(nft_data, 'creator', None)
+            ))
+            cached = self.decision_cache.lookup(embedding, meta_hash)
+            if cached is not None:
+                cached["cache_hit"] = True
+                return cached
+            
+            # Concurrent decisions are grouped into one Gemini request by the batcher
+            fraud_decision = await self._decision_batcher.submit(
+                (nft_data, image_analysis, similarity_results, metadata_analysis)
+            )
+            
+            # Truncated or partially stated verdicts are used for this NFT only: their
+            # defaulted confidence of 0.0 would otherwise pass as a clear-cut ALLOW
+            if fraud_decision.get("fallback_used") or "error" in fraud_decision or fraud_decision.get("incomplete"):
                 return fraud_decision
-                
-            except Exception as parse_error:
-                logger.warning(f"Failed to parse LLM decision: {parse_error}")
-                logger.warning(f"Raw response: {response.content[:200] if hasattr(response, 'content') else 'No content'}")
-                # Use intelligent fallback decision
-                return self._get_safe_fallback_decision(nft_data, image_analysis, similarity_results, metadata_analysis)
+            self._exact_decisions[prompt_key] = dict(fraud_decision)
+            # Only share clear-cut LLM verdicts with near-identical NFTs, so borderline calls get re-evaluated
+            confidence_score = fraud_decision["confidence_score"]
+            if confidence_score >= 0.7 or confidence_score < 0.2:
+                self.decision_cache.put(embedding, meta_hash, fraud_decision)
+            return fraud_decision
             
         except Exception as e:
-            logger.error(f"Error in LLM fraud decision: {e}")
+            logger.error("Error in LLM fraud decision: %s", e)
             return {
                 "is_fraud": False,
                 "confidence_score": 0.0,
@@ -713,39 +1101,129 @@ class UnifiedFraudDetector:
                 "reason": f"Decision analysis error: {str(e)}",
                 "error": str(e)
             }
-
+    
+    async def _batch_make_fraud_decisions(self, items: List[tuple]) -> List[Dict[str, Any]]:
+        """Make fraud decisions for several NFTs with a single LLM call"""
+        if len(items) == 1:
+            return [await self._make_llm_fraud_decision_single(*items[0])]
+        
+        decision_prompt = "\n".join(
+            f"NFT index {i}:\n" + DECISION_TEMPLATE.format(**self._decision_inputs(*item))
+            for i, item in enumerate(items)
+        )
+        
+        try:
+            decisions, complete = await self._invoke_batch_chain([
+                SystemMessage(content=DECISION_SYSTEM_PROMPT + BATCH_RESPONSE_INSTRUCTIONS),
+                HumanMessage(content=decision_prompt)
+            ], len(items))
+        except RETRYABLE_GEMINI_ERRORS as e:
+            # Gemini still unavailable after retries: score the whole batch heuristically
+            # rather than retrying each NFT against the same outage
+            logger.warning(f"Gemini unavailable for {len(items)} fraud decisions, using fallback: {e}")
+            return self._get_safe_fallback_decision_batch(items)
+        if decisions is None:
+            # Malformed batch response: retry each NFT on its own
+            logger.warning(f"Falling back to per-NFT fraud decisions for {len(items)} NFTs")
+            return list(await asyncio.gather(*(self._make_llm_fraud_decision_single(*item) for item in items)))
+        
+        return [_decision_from_llm(decision, complete) for decision in decisions]
+    
+    def _decision_inputs(
+        self,
+        nft_data: NFTData,
+        image_analysis: Dict[str, Any],
+        similarity_results: Dict[str, Any],
+        metadata_analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Variables for DECISION_TEMPLATE"""
+        return {
+            "title": nft_data.title,
+            "description": nft_data.description,
+            "category": nft_data.category,
+            "price": nft_data.price,
+            "image_fraud_score": image_analysis.get("overall_fraud_score", 0.0),
+            "image_risk_level": image_analysis.get("risk_level", "unknown"),
+            "image_fraud_indicators": image_analysis.get("fraud_indicators", {}),
+            "max_similarity": similarity_results.get("max_similarity", 0.0),
+            "similar_nft_count": similarity_results.get("similarity_count", len(similarity_results.get("similar_nfts", []))),
+            "is_duplicate": similarity_results.get("is_duplicate", False),
+            "quality_score": metadata_analysis.get("quality_score", 0.0),
+            "suspicious_indicators": metadata_analysis.get("suspicious_indicators", []),
+            "metadata_risk": metadata_analysis.get("metadata_risk", 0.0)
+        }
+    
+    async def _make_llm_fraud_decision_single(
+        self, 
+        nft_data: NFTData,
+        image_analysis: Dict[str, Any], 
+        similarity_results: Dict[str, Any], 
+        metadata_analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Make one NFT's fraud decision with its own LLM call"""
+        try:
+            parsed, complete = await call_gemini(
+                _stream_json,
+                self._decision_chain,
+                self._decision_inputs(nft_data, image_analysis, similarity_results, metadata_analysis)
+            )
+            fraud_decision = _decision_from_llm(parsed, complete)
+            logger.debug("LLM fraud decision: %s", fraud_decision)
+            return fraud_decision
+            
+        except (OutputParserException, ValidationError) as parse_error:
+            logger.warning("Failed to parse LLM decision: %s", _LOG_REPR.repr(parse_error))
+            # Use intelligent fallback decision
+            return self._get_safe_fallback_decision(nft_data, image_analysis, similarity_results, metadata_analysis)
+        except Exception as e:
+            logger.error("Error in LLM fraud decision: %s", e)
+            return {
+                "is_fraud": False,
+                "confidence_score": 0.0,
+                "flag_type": None,
+                "reason": f"Decision analysis error: {str(e)}",
+                "error": str(e)
+            }
+    
     def _get_safe_fallback_decision(self, nft_data: NFTData, image_analysis: Dict, similarity_results: Dict, metadata_analysis: Dict) -> Dict[str, Any]:
         """Generate a safe fallback decision when LLM parsing fails"""
+        return self._get_safe_fallback_decision_batch([
+            (nft_data, image_analysis, similarity_results, metadata_analysis)
+        ])[0]
+    
+    def _get_safe_fallback_decision_batch(self, items: List[tuple]) -> List[Dict[str, Any]]:
+        """Fallback decisions for a batch of decision inputs, scored with one matrix-vector product"""
         # Use combined heuristic approach
-        image_risk = image_analysis.get("overall_fraud_score", 0.0) if image_analysis else 0.0
-        similarity_risk = similarity_results.get("max_similarity", 0.0) if similarity_results else 0.0
-        metadata_risk = metadata_analysis.get("metadata_risk", 0.0) if metadata_analysis else 0.0
+        risks = np.array([
+            (
+                image_analysis.get("overall_fraud_score", 0.0) if image_analysis else 0.0,
+                similarity_results.get("max_similarity", 0.0) if similarity_results else 0.0,
+                metadata_analysis.get("metadata_risk", 0.0) if metadata_analysis else 0.0
+            )
+            for _, image_analysis, similarity_results, metadata_analysis in items
+        ], dtype=np.float64).reshape(-1, 3)
         
         # Weight the different factors
-        combined_risk = (image_risk * 0.5) + (similarity_risk * 0.3) + (metadata_risk * 0.2)
-        
-        # Conservative approach - only flag if multiple indicators
-        is_fraud = combined_risk > 0.7
-        confidence_score = min(combined_risk, 0.8)  # Cap confidence since we're using fallback
-        
-        flag_type = None
-        if combined_risk > 0.8:
-            flag_type = 1  # High risk
-        elif combined_risk > 0.6:
-            flag_type = 2  # Medium risk
+        combined_risks = risks @ FALLBACK_RISK_WEIGHTS
+        # 1 = high risk (> 0.8), 2 = medium risk (> 0.6), 0 = no flag
+        flag_types = np.where(combined_risks > 0.8, 1, np.where(combined_risks > 0.6, 2, 0))
         
-        reason = f"Fallback analysis (LLM unavailable) - Combined risk: {combined_risk:.2f}"
-        if similarity_results.get("is_duplicate"):
-            reason += " - Potential duplicate detected"
-        
-        return {
-            "is_fraud": is_fraud,
-            "confidence_score": confidence_score,
-            "flag_type": flag_type,
-            "reason": reason,
-            "recommendation": "MANUAL_REVIEW" if combined_risk > 0.5 else "ALLOW",
-            "fallback_used": True
-        }
+        decisions = []
+        for (_, _, similarity_results, _), combined_risk, flag_type in zip(items, combined_risks.tolist(), flag_types.tolist()):
+            reason = f"Fallback analysis (LLM unavailable) - Combined risk: {combined_risk:.2f}"
+            if similarity_results and similarity_results.get("is_duplicate"):
+                reason += " - Potential duplicate detected"
+            
+            decisions.append({
+                # Conservative approach - only flag if multiple indicators
+                "is_fraud": combined_risk > 0.7,
+                "confidence_score": min(combined_risk, 0.8),  # Cap confidence since we're using fallback
+                "flag_type": flag_type or None,
+                "reason": reason,
+                "recommendation": "MANUAL_REVIEW" if combined_risk > 0.5 else "ALLOW",
+                "fallback_used": True
+            })
+        return decisions
 
 
 # Global fraud detector instance
@@ -757,6 +1235,39 @@ async def initialize_fraud_detector() -> bool:
     return await unified_fraud_detector.initialize()
 
 
+async def close_fraud_detector() -> None:
+    """Release resources held by the unified fraud detector"""
+    await unified_fraud_detector.close()
+
+
+def index_nft_embedding(nft) -> None:
+    """Make a just-committed NFT embedding visible to the in-process similarity index"""
+    unified_fraud_detector.vector_index.add(
+        nft.id, nft.embedding_vector, nft.title, nft.image_url, nft.creator_wallet_address
+    )
+
+
+def _analysis_update_values(result: Dict[str, Any]) -> Dict[str, Any]:
+    """NFT column values recording a completed analysis result"""
+    analysis_details = result.get("analysis_details", {})
+    analysis_details.update({
+        "status": "completed",
+        "analyzed_at": _now_iso(),
+        "is_fraud": result.get("is_fraud", False),
+        "confidence_score": result.get("confidence_score", 0.0),
+        "flag_type": result.get("flag_type"),
+        "reason": result.get("reason", "Analysis completed")
+    })
+    values = {"analysis_details": analysis_details}
+    # Failed image analyses report an empty embedding, which vector(768) rejects
+    embedding = analysis_details.get("image_analysis", {}).get("embedding")
+    if embedding:
+        values["embedding_vector"] = embedding
+        # Core UPDATEs skip the ORM "set" listener that keeps the int8 copy in step
+        values["embedding_int8"], values["embedding_scale"] = quantize_embedding(embedding)
+    return values
+
+
 async def analyze_nft_for_fraud(nft_data: NFTData, nft_id: str = None, db_session = None) -> Dict[str, Any]:
     """
     Unified NFT fraud analysis using Google Gemini LLM
@@ -769,7 +1280,7 @@ async def analyze_nft_for_fraud(nft_data: NFTData, nft_id: str = None, db_sessio
     
     Args:
         nft_data: NFT data to analyze
-        nft_id: Optional NFT ID for database updates
+        nft_id: Optional NFT ID for database updates; also excluded from its own similarity matches
         db_session: Optional database session for updates
     
     Returns:
@@ -789,42 +1300,30 @@ async def analyze_nft_for_fraud(nft_data: NFTData, nft_id: str = None, db_sessio
             await unified_fraud_detector.initialize()
 
         # Use the unified fraud detector
-        result = await unified_fraud_detector.analyze_nft_for_fraud(nft_data)
+        result = await unified_fraud_detector.analyze_nft_for_fraud(nft_data, nft_id)
         
         # Update database if NFT ID and session are provided
         if nft_id and db_session:
             try:
-                from models.database import NFT
-                nft = db_session.query(NFT).filter(NFT.id == nft_id).first()
-                if nft:
-                    # Update NFT with analysis results
-                    nft.analysis_details = result.get("analysis_details", {})
-                    nft.analysis_details.update({
-                        "status": "completed",
-                        "analyzed_at": datetime.now().isoformat(),
-                        "is_fraud": result.get("is_fraud", False),
-                        "confidence_score": result.get("confidence_score", 0.0),
-                        "flag_type": result.get("flag_type"),
-                        "reason": result.get("reason", "Analysis completed")
-                    })
-                    
-                    # Update embedding vector if available
-                    logger.info(f"Checking for embedding in result structure...")
-                    logger.info(f"Result keys: {list(result.keys())}")
-                    if "analysis_details" in result:
-                        logger.info(f"Analysis details keys: {list(result['analysis_details'].keys())}")
-                        if "image_analysis" in result["analysis_details"]:
-                            logger.info(f"Image analysis keys: {list(result['analysis_details']['image_analysis'].keys())}")
-                    
-                    if "image_analysis" in result.get("analysis_details", {}) and "embedding" in result["analysis_details"]["image_analysis"]:
-                        embedding = result["analysis_details"]["image_analysis"]["embedding"]
-                        logger.info(f"Found embedding for NFT {nft_id}, dimension: {len(embedding) if embedding else 0}")
-                        nft.embedding_vector = embedding
-                    else:
-                        logger.warning(f"No embedding found in analysis results for NFT {nft_id}")
-                        logger.warning(f"Available keys in image_analysis: {list(result.get('analysis_details', {}).get('image_analysis', {}).keys())}")
-                    
+                values = _analysis_update_values(result)
+                if "embedding_vector" in values:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Found embedding for NFT %s, dimension: %d", nft_id, len(values['embedding_vector'] or []))
+                else:
+                    logger.warning(f"No embedding found in analysis results for NFT {nft_id}")
+                
+                # One UPDATE ... RETURNING instead of SELECT + UPDATE: a missing
+                # NFT simply returns no row
+                updated = db_session.execute(
+                    update(NFT)
+                    .where(NFT.id == nft_id)
+                    .values(**values)
+                    .returning(NFT.id, NFT.embedding_vector, NFT.title, NFT.image_url, NFT.creator_wallet_address)
+                ).first()
+                if updated:
                     db_session.commit()
+                    if "embedding_vector" in values:
+                        index_nft_embedding(updated)
                     logger.info(f"Updated NFT {nft_id} with analysis results")
                 else:
                     logger.warning(f"NFT {nft_id} not found for database update")
@@ -839,72 +1338,80 @@ async def analyze_nft_for_fraud(nft_data: NFTData, nft_id: str = None, db_sessio
     except Exception as e:
         logger.error(f"Error in unified fraud analysis: {e}")
         # Return safe default values on error with proper image analysis structure
+        error = str(e)
+        image_details = orjson.loads(_ERROR_IMAGE_ANALYSIS_JSON)
+        image_details["description"] = f"Error in unified analysis: {error}"
+        image_details["additional_notes"] = f"Unified analysis error: {error}"
         return {
             "is_fraud": False,
             "confidence_score": 0.0,
             "flag_type": None,
-            "reason": f"Analysis error: {str(e)}",
+            "reason": f"Analysis error: {error}",
             "analysis_details": {
-                "image_analysis": {
-                    "description": f"Error in unified analysis: {str(e)}",
-                    "artistic_style": "unknown",
-                    "quality_assessment": "Analysis failed",
-                    "fraud_indicators": {
-                        "low_effort_generation": {
-                            "detected": False,
-                            "confidence": 0.0,
-                            "evidence": "Analysis failed"
-                        },
-                        "stolen_artwork": {
-                            "detected": False,
-                            "confidence": 0.0,
-                            "evidence": "Analysis failed"
-                        },
-                        "ai_generated": {
-                            "detected": False,
-                            "confidence": 0.0,
-                            "evidence": "Analysis failed"
-                        },
-                        "template_usage": {
-                            "detected": False,
-                            "confidence": 0.0,
-                            "evidence": "Analysis failed"
-                        },
-                        "metadata_mismatch": {
-                            "detected": False,
-                            "confidence": 0.0,
-                            "evidence": "Analysis failed"
-                        },
-                        "copyright_violation": {
-                            "detected": False,
-                            "confidence": 0.0,
-                            "evidence": "Analysis failed"
-                        },
-                        "inappropriate_content": {
-                            "detected": False,
-                            "confidence": 0.0,
-                            "evidence": "Analysis failed"
-                        }
-                    },
-                    "overall_fraud_score": 0.0,
-                    "risk_level": "unknown",
-                    "key_visual_elements": [],
-                    "color_palette": [],
-                    "composition_analysis": "Analysis failed",
-                    "uniqueness_score": 0.0,
-                    "artistic_merit": "Analysis failed",
-                    "technical_quality": "Analysis failed",
-                    "market_value_assessment": "Analysis failed",
-                    "recommendation": "Manual review required",
-                    "confidence_in_analysis": 0.0,
-                    "additional_notes": f"Unified analysis error: {str(e)}",
-                    "embedding": [],
-                    "embedding_dimension": 0
-                },
-                "similarity_results": {"error": str(e)},
-                "metadata_analysis": {"error": str(e)},
-                "llm_decision": {"error": str(e)},
-                "analysis_timestamp": datetime.now().isoformat(),
-                "error": str(e)
+                "image_analysis": image_details,
+                "similarity_results": {"error": error},
+                "metadata_analysis": {"error": error},
+                "llm_decision": {"error": error},
+                "analysis_timestamp": _now_iso(),
+                "error": error
             }
-        }
\ No newline at end of file
+        }
+
+
+async def analyze_nfts_for_fraud_batch(
+    nfts: List[NFTData],
+    nft_ids: Optional[List[str]] = None,
+    db_session = None
+) -> List[Dict[str, Any]]:
+    """
+    Unified fraud analysis for several NFTs at once (backfills, re-scans)
+    
+    The analyses run concurrently, so their metadata and decision steps are grouped
+    into multi-NFT Gemini requests by the detector's micro-batchers, and the results
+    are written with one executemany UPDATE and a single commit.
+    
+    Args:
+        nfts: NFT data to analyze
+        nft_ids: Optional NFT IDs, in the same order as nfts, for database updates
+        db_session: Optional database session for updates
+    
+    Returns:
+        One result per NFT, shaped like analyze_nft_for_fraud's
+    """
+    logger.info(f"Starting unified LLM fraud analysis for {len(nfts)} NFTs")
+    if not unified_fraud_detector.initialized:
+        await unified_fraud_detector.initialize()
+    
+    # The detector returns an error result rather than raising, so one failure cannot sink the batch
+    ids = nft_ids or [None] * len(nfts)
+    results = list(await asyncio.gather(*(
+        unified_fraud_detector.analyze_nft_for_fraud(nft_data, nft_id) for nft_data, nft_id in zip(nfts, ids)
+    )))
+    
+    if nft_ids and db_session:
+        try:
+            rows = [{"nft_id": nft_id, **_analysis_update_values(result)} for nft_id, result in zip(nft_ids, results)]
+            nft_table = NFT.__table__
+            statement = update(nft_table).where(nft_table.c.id == bindparam("nft_id"))
+            # executemany needs one column set per statement, so rows with a new
+            # embedding (vector plus its int8 codes and scale) are sent separately
+            embedded = [row for row in rows if "embedding_vector" in row]
+            plain = [row for row in rows if "embedding_vector" not in row]
+            for group in (embedded, plain):
+                if group:
+                    db_session.execute(statement, group)
+            db_session.commit()
+            
+            if embedded:
+                updated = db_session.execute(
+                    select(NFT.id, NFT.embedding_vector, NFT.title, NFT.image_url, NFT.creator_wallet_address)
+                    .where(NFT.id.in_([row["nft_id"] for row in embedded]))
+                )
+                for nft in updated:
+                    index_nft_embedding(nft)
+            logger.info(f"Updated {len(rows)} NFTs with analysis results")
+        except Exception as db_error:
+            logger.error(f"Error updating {len(nft_ids)} NFTs in database: {db_error}")
+            db_session.rollback()
+    
+    return results
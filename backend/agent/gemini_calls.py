@@ -0,0 +1,49 @@
+"""
+Shared Gemini call gate for FraudGuard
+Every Gemini request (fraud decisions, metadata, image analysis, embeddings) goes
+through one concurrency cap with exponential backoff on rate limits and 5xx errors
+"""
+import asyncio
+import logging
+import random
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    # 429 rate limits and transient 5xx responses are worth retrying
+    RETRYABLE_GEMINI_ERRORS = (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout,
+    )
+except ImportError:
+    RETRYABLE_GEMINI_ERRORS = ()
+
+try:
+    from core.config import settings
+except ImportError:
+    from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared cap on in-flight Gemini requests; callers beyond it wait here instead
+# of piling up 429s. Calls made through call_gemini must not nest, or a full
+# semaphore would deadlock
+_GEMINI_SEM = asyncio.Semaphore(settings.gemini_max_concurrency)
+
+
+async def call_gemini(call, *args, **kwargs):
+    """Await a Gemini call under the concurrency cap, retrying 429/5xx with exponential backoff"""
+    for attempt in range(settings.gemini_max_retries + 1):
+        try:
+            async with _GEMINI_SEM:
+                return await call(*args, **kwargs)
+        except RETRYABLE_GEMINI_ERRORS as e:
+            if attempt == settings.gemini_max_retries:
+                raise
+            # Back off outside the semaphore so queued callers can use the slot
+            delay = min(2 ** attempt, 30) + random.uniform(0, 1)
+            logger.warning(f"Gemini request failed ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
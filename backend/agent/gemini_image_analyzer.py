@@ -6,20 +6,29 @@ Extracts detailed descriptions from NFT images for fraud detection analysis
 import logging
 import base64
 import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, Optional, List
 from io import BytesIO
-import json
 from dotenv import load_dotenv
 load_dotenv()
 import os
+import numpy as np
+import orjson
+from cachetools import LRUCache
 try:
-    import requests
+    import diskcache
+except ImportError:
+    diskcache = None
+try:
+    import httpx
     from PIL import Image
     from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
     from langchain.schema import HumanMessage
 except ImportError as e:
     logging.warning(f"Missing dependencies for Gemini analysis: {e}")
-    requests = None
+    httpx = None
     Image = None
     ChatGoogleGenerativeAI = None
     GoogleGenerativeAIEmbeddings = None
@@ -27,11 +36,249 @@ except ImportError as e:
 
 try:
     from core.config import settings
+    from agent.gemini_calls import call_gemini
+    from agent.micro_batcher import MicroBatcher
 except ImportError:
     from backend.core.config import settings
+    from backend.agent.gemini_calls import call_gemini
+    from backend.agent.micro_batcher import MicroBatcher
 
 logger = logging.getLogger(__name__)
 
+# JPEG start-of-image marker, and the largest JPEG checked for passthrough on the event loop
+JPEG_MAGIC = b"\xff\xd8\xff"
+JPEG_PASSTHROUGH_MAX_BYTES = 300 * 1024
+
+# Description embeddings kept in memory (float32, ~3 KB each), keyed by a hash of the text
+DESCRIPTION_EMBEDDING_CACHE_SIZE = 4096
+
+# Fraud indicators every parsed analysis must carry
+REQUIRED_FRAUD_INDICATORS = (
+    "low_effort_generation", "stolen_artwork", "ai_generated",
+    "template_usage", "metadata_mismatch", "copyright_violation",
+    "inappropriate_content"
+)
+
+# Defaults for analysis fields missing from a response. List fields get a fresh []
+# per response, and "recommendation" depends on the fraud score
+REQUIRED_ANALYSIS_FIELDS = {
+    "artistic_style": "unknown",
+    "quality_assessment": "Analysis completed",
+    "composition_analysis": "Analysis completed",
+    "uniqueness_score": 0.0,
+    "artistic_merit": "Analysis completed",
+    "technical_quality": "Analysis completed",
+    "market_value_assessment": "Analysis completed",
+    "confidence_in_analysis": 0.8,
+    "additional_notes": "Analysis completed successfully"
+}
+LIST_ANALYSIS_FIELDS = ("key_visual_elements", "color_palette")
+NUMERIC_ANALYSIS_FIELDS = frozenset({"uniqueness_score", "confidence_in_analysis"})
+
+# Shared body of the error analyses, stored serialized: orjson.loads hands each
+# error result its own copy faster than rebuilding or deep-copying the literal
+_ERROR_ANALYSIS_JSON = orjson.dumps({
+    "description": "",
+    "artistic_style": "unknown",
+    "quality_assessment": "Analysis failed",
+    "fraud_indicators": {
+        name: {"detected": False, "confidence": 0.0, "evidence": "Analysis failed"}
+        for name in REQUIRED_FRAUD_INDICATORS
+    },
+    "overall_fraud_score": 0.0,
+    "risk_level": "unknown",
+    "key_visual_elements": [],
+    "color_palette": [],
+    "composition_analysis": "Analysis failed",
+    "uniqueness_score": 0.0,
+    "artistic_merit": "Analysis failed",
+    "technical_quality": "Analysis failed",
+    "market_value_assessment": "Analysis failed",
+    "recommendation": "Manual review required - Analysis error",
+    "confidence_in_analysis": 0.0,
+    "additional_notes": ""
+})
+
+# Fraud analysis prompt, built once; only the metadata fields are filled per call
+_FRAUD_ANALYSIS_PROMPT_TEMPLATE = """
+        You are an expert NFT fraud detection analyst. Analyze this NFT image and respond with ONLY a valid JSON object.
+
+        NFT Metadata:
+        - Title: {title}
+        - Creator: {creator}
+        - Collection: {collection}
+        - Description: {description}
+        - Category: {category}
+
+        CRITICAL: Respond with ONLY valid JSON. No text before or after. No markdown formatting.
+
+        Required JSON structure:
+        {{
+            "description": "Detailed visual description of the image (200+ words). Include all visual elements, colors, composition, style, textures, lighting, perspective, text, symbols. Describe artistic technique, medium, and aesthetic quality.",
+            "artistic_style": "Art style classification (e.g., pixel art, 3D render, photography, digital art, oil painting, watercolor)",
+            "quality_assessment": "Image quality rating (1-10) with technical analysis of resolution, color depth, compression artifacts, production value",
+            "fraud_indicators": {{
+                "low_effort_generation": {{
+                    "detected": false,
+                    "confidence": 0.0,
+                    "evidence": "Analysis of effort level, complexity, originality, artistic merit"
+                }},
+                "stolen_artwork": {{
+                    "detected": false,
+                    "confidence": 0.0,
+                    "evidence": "Analysis of watermarks, signatures, style inconsistencies, plagiarism signs"
+                }},
+                "ai_generated": {{
+                    "detected": false,
+                    "confidence": 0.0,
+                    "evidence": "Identification of AI generation artifacts, unnatural patterns, AI-generated characteristics"
+                }},
+                "template_usage": {{
+                    "detected": false,
+                    "confidence": 0.0,
+                    "evidence": "Detection of generic templates, common patterns, mass-produced elements"
+                }},
+                "metadata_mismatch": {{
+                    "detected": false,
+                    "confidence": 0.0,
+                    "evidence": "Analysis of whether image content matches claimed title, description, category"
+                }},
+                "copyright_violation": {{
+                    "detected": false,
+                    "confidence": 0.0,
+                    "evidence": "Signs of copyrighted characters, logos, brands, protected IP"
+                }},
+                "inappropriate_content": {{
+                    "detected": false,
+                    "confidence": 0.0,
+                    "evidence": "Detection of NSFW content, violence, hate speech, inappropriate material"
+                }}
+            }},
+            "overall_fraud_score": 0.0,
+            "risk_level": "low",
+            "key_visual_elements": ["list", "of", "important", "visual", "elements"],
+            "color_palette": ["analysis", "of", "color", "scheme"],
+            "composition_analysis": "Analysis of image composition, layout, focal points, balance, visual hierarchy",
+            "uniqueness_score": 0.0,
+            "artistic_merit": "Assessment of artistic value, creativity, skill level, cultural significance",
+            "technical_quality": "Technical analysis of resolution, file quality, compression, production standards",
+            "market_value_assessment": "Estimation of fair market value based on artistic merit, rarity, market trends",
+            "recommendation": "Clear, actionable recommendation with specific next steps",
+            "confidence_in_analysis": 0.0,
+            "additional_notes": "Additional observations, concerns, or positive aspects"
+        }}
+
+        ANALYSIS REQUIREMENTS:
+        1. Examine image for fraud indicators: plagiarism, AI generation, low effort, stolen content
+        2. Assess artistic quality, originality, and technical merit
+        3. Check for metadata inconsistencies and copyright violations
+        4. Evaluate market value and authenticity indicators
+        5. Provide specific evidence for each fraud indicator
+        6. Calculate overall fraud score (0.0-1.0) based on detected risks
+        7. Determine risk level: low (0.0-0.3), medium (0.3-0.7), high (0.7-1.0)
+        8. Give clear recommendation: ALLOW, FLAG, or BLOCK
+
+        RESPONSE FORMAT:
+        - Return ONLY the JSON object
+        - Use actual numbers for scores (not strings)
+        - Use true/false for boolean values (not "True"/"False")
+        - Ensure JSON is valid and complete
+        - No additional text or formatting
+        """
+
+
+def normalize_embedding(embedding: List[float]) -> List[float]:
+    """L2-normalize an embedding so inner product equals cosine similarity"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector /= np.linalg.norm(vector) + 1e-12
+    return vector.tolist()
+
+
+def to_vector_literal(embedding) -> str:
+    """
+    Encode an embedding as a pgvector text literal ("[0.1,0.2,...]").
+    orjson writes float32 arrays in their shortest repr, several times faster
+    than str.join over Python floats and with a much smaller payload.
+    """
+    vector = np.ascontiguousarray(embedding, dtype=np.float32)
+    return orjson.dumps(vector, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced top-level {...} block in text, or None.
+    Tracks brace depth in one pass, skipping braces inside JSON strings, so
+    code fences and surrounding prose need no separate stripping.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    # Unbalanced braces: the response was truncated
+    return None
+
+
+def jpeg_passthrough(image: "Image.Image", content: bytes, max_edge: int) -> Optional[str]:
+    """Base64 of the original bytes if they are already an RGB JPEG within max_edge, else None"""
+    if image.format == 'JPEG' and image.mode == 'RGB' and max(image.size) <= max_edge:
+        return base64.b64encode(content).decode('utf-8')
+    return None
+
+
+def encode_image(content: bytes, max_edge: int, quality: int) -> str:
+    """
+    Normalize image bytes to an RGB JPEG within max_edge, base64-encoded.
+    Module-level and settings-free so it can run in the image worker processes.
+    """
+    # Image.open only reads the header; pixels are decoded on first use
+    image = Image.open(BytesIO(content))
+    passthrough = jpeg_passthrough(image, content, max_edge)
+    if passthrough is not None:
+        return passthrough
+    
+    # Fraud screening does not need full resolution, and vision tokens grow with image size
+    width, height = image.size
+    if image.format == 'JPEG' and max(width, height) > max_edge:
+        # libjpeg-turbo can decode straight to 1/2, 1/4 or 1/8 scale in the DCT
+        # domain, skipping most of the full-size decode; draft() picks the smallest
+        # scale that still covers the target, and LANCZOS finishes the resize
+        ratio = max_edge / max(width, height)
+        image.draft('RGB', (max(1, int(width * ratio)), max(1, int(height * ratio))))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _image_pool_context():
+    """Start image workers from a clean server process; forking the threaded server is unsafe"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
 
 class GeminiImageAnalyzer:
     """Google Gemini-powered image analysis for fraud detection"""
@@ -40,6 +287,22 @@ class GeminiImageAnalyzer:
         self.gemini_chat = None
         self.embeddings = None
         self.initialized = False
+        # Shared across downloads so repeat hosts (IPFS gateways, storage buckets)
+        # reuse pooled keep-alive connections
+        self._http_client: Optional["httpx.AsyncClient"] = None
+        # Worker processes for image decode/resize/encode, started on first use
+        self._image_pool: Optional[ProcessPoolExecutor] = None
+        # Collections often reuse artwork, so identical descriptions recur
+        self._description_embeddings = LRUCache(maxsize=DESCRIPTION_EMBEDDING_CACHE_SIZE)
+        # Concurrent analyses share one embedding request
+        self._embedding_batcher = MicroBatcher(self._embed_batch, batch_size=32, max_wait=0.02)
+        # Completed analyses persisted across restarts, keyed by image and prompt
+        self._disk_cache = None
+        if diskcache and settings.embedding_cache_dir:
+            self._disk_cache = diskcache.Cache(
+                settings.embedding_cache_dir,
+                size_limit=settings.embedding_cache_size_limit_mb * 1024 * 1024
+            )
         
     async def initialize(self) -> bool:
         """Initialize Gemini models"""
@@ -62,6 +325,7 @@ class GeminiImageAnalyzer:
                     model=settings.google_model or "gemini-2.5-flash-lite",
                     google_api_key=settings.google_api_key,
                     temperature=0.1,  # Low temperature for consistent analysis
+                    max_retries=0  # retried by call_gemini, outside the concurrency cap
                 )
                 logger.info("Gemini chat model initialized successfully")
             except Exception as chat_error:
@@ -119,52 +383,24 @@ class GeminiImageAnalyzer:
                 ]
             )
             
-            response = await self.gemini_chat.ainvoke([message])
-            analysis_text = response.content
+            # Same image bytes and same prompt give the same analysis
+            cache_key = hashlib.sha256(
+                f"{settings.google_model}\x1f{prompt}\x1f{image_data}".encode()
+            ).hexdigest()
+            cached = await self._get_cached_analysis(cache_key)
+            if cached is not None:
+                logger.info(f"Using cached Gemini analysis for image: {image_url}")
+                return cached
+            
+            analysis_text = await call_gemini(self._stream_analysis_text, [message])
 
             
             # Parse Gemini response into structured format
             structured_analysis = self._parse_gemini_response(analysis_text)
             
             # Generate embeddings for the description
-            if self.embeddings and structured_analysis.get("description"):
-                try:
-                    logger.info(f"Generating embedding for description: {structured_analysis['description'][:100]}...")
-                    embedding = await self.embeddings.aembed_query(structured_analysis["description"])
-                    structured_analysis["embedding"] = embedding
-                    structured_analysis["embedding_dimension"] = len(embedding)
-                    logger.info(f"Successfully generated embedding with dimension: {len(embedding)}")
-                except Exception as embed_error:
-                    logger.error(f"Error generating embedding: {embed_error}")
-                    logger.error(f"Embedding model status: {self.embeddings is not None}")
-                    logger.error(f"Description available: {bool(structured_analysis.get('description'))}")
-                    
-                    # Try to generate a fallback embedding using a simple method
-                    try:
-                        fallback_embedding = await self._generate_fallback_embedding(structured_analysis["description"])
-                        structured_analysis["embedding"] = fallback_embedding
-                        structured_analysis["embedding_dimension"] = len(fallback_embedding)
-                        logger.info(f"Generated fallback embedding with dimension: {len(fallback_embedding)}")
-                    except Exception as fallback_error:
-                        logger.error(f"Fallback embedding generation also failed: {fallback_error}")
-                        structured_analysis["embedding"] = []
-                        structured_analysis["embedding_dimension"] = 0
-            else:
-                logger.warning("No embeddings model available or no description to embed")
-                logger.warning(f"Embeddings model available: {self.embeddings is not None}")
-                logger.warning(f"Description available: {bool(structured_analysis.get('description'))}")
-                
-                # Try to generate a fallback embedding even without the model
-                if structured_analysis.get("description"):
-                    try:
-                        fallback_embedding = await self._generate_fallback_embedding(structured_analysis["description"])
-                        structured_analysis["embedding"] = fallback_embedding
-                        structured_analysis["embedding_dimension"] = len(fallback_embedding)
-                        logger.info(f"Generated fallback embedding with dimension: {len(fallback_embedding)}")
-                    except Exception as fallback_error:
-                        logger.error(f"Fallback embedding generation failed: {fallback_error}")
-                        structured_analysis["embedding"] = []
-                        structured_analysis["embedding_dimension"] = 0
+            await self._attach_embedding(structured_analysis)
+            await self._cache_analysis(cache_key, structured_analysis)
             
             logger.info(f"Completed Gemini analysis for image: {image_url}")
             return structured_analysis
@@ -172,190 +408,157 @@ class GeminiImageAnalyzer:
         except Exception as e:
             logger.error(f"Error in Gemini image analysis: {e}")
             # Return structured error response instead of raising
-            return {
-                "description": f"Error analyzing image: {str(e)}",
-                "artistic_style": "unknown",
-                "quality_assessment": "Analysis failed",
-                "fraud_indicators": {
-                    "low_effort_generation": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "stolen_artwork": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "ai_generated": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "template_usage": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "metadata_mismatch": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "copyright_violation": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    },
-                    "inappropriate_content": {
-                        "detected": False,
-                        "confidence": 0.0,
-                        "evidence": "Analysis failed"
-                    }
-                },
-                "overall_fraud_score": 0.0,
-                "risk_level": "unknown",
-                "key_visual_elements": [],
-                "color_palette": [],
-                "composition_analysis": "Analysis failed",
-                "uniqueness_score": 0.0,
-                "artistic_merit": "Analysis failed",
-                "technical_quality": "Analysis failed",
-                "market_value_assessment": "Analysis failed",
-                "recommendation": "Manual review required - Analysis error",
-                "confidence_in_analysis": 0.0,
-                "additional_notes": f"Error: {str(e)}"
-            }
+            return self._create_error_response(str(e))
+    
+    async def _stream_analysis_text(self, messages: List[Any]) -> str:
+        """
+        Stream Gemini's reply and stop as soon as its JSON object closes, so any
+        trailing commentary is neither waited for nor generated. Falls back to a
+        buffered call if the stream fails.
+        """
+        chunks: List[str] = []
+        stream = self.gemini_chat.astream(messages)
+        try:
+            async for chunk in stream:
+                content = chunk.content if isinstance(chunk.content, str) else ""
+                chunks.append(content)
+                # Only a closing brace can complete the object, so skip the scan otherwise
+                if "}" in content and extract_json_object("".join(chunks)):
+                    break
+        except Exception as stream_error:
+            logger.warning(f"Gemini stream failed, retrying without streaming: {stream_error}")
+            response = await self.gemini_chat.ainvoke(messages)
+            return response.content
+        finally:
+            # Closing the generator early cancels the rest of the generation
+            await stream.aclose()
+        return "".join(chunks)
+    
+    async def _read_capped(self, image_url: str, max_bytes: int) -> Optional[bytes]:
+        """Stream the response body, giving up (None) once it exceeds max_bytes"""
+        async with self._http_client.stream("GET", image_url) as response:
+            response.raise_for_status()
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                logger.warning(f"Image too large ({declared} bytes, limit {max_bytes}): {image_url}")
+                return None
+            content = bytearray()
+            async for chunk in response.aiter_bytes(64 * 1024):
+                content += chunk
+                if len(content) > max_bytes:
+                    logger.warning(f"Image exceeds {max_bytes} bytes, download aborted: {image_url}")
+                    return None
+            return bytes(content)
+    
+    async def _get_cached_analysis(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Look up a persisted analysis; diskcache does file I/O, so it runs off the event loop"""
+        if self._disk_cache is None:
+            return None
+        try:
+            blob = await asyncio.to_thread(self._disk_cache.get, cache_key)
+            return orjson.loads(blob) if blob is not None else None
+        except Exception as e:
+            logger.warning(f"Analysis cache read failed: {e}")
+            return None
+    
+    async def _cache_analysis(self, cache_key: str, analysis: Dict[str, Any]) -> None:
+        """Persist a complete analysis; error and text-extraction results are not kept"""
+        if self._disk_cache is None:
+            return
+        if analysis.get("risk_level") == "unknown" or not analysis.get("embedding"):
+            return
+        if analysis.get("confidence_in_analysis", 0.0) < 0.5:
+            return
+        try:
+            await asyncio.to_thread(
+                self._disk_cache.set,
+                cache_key,
+                orjson.dumps(analysis),
+                expire=settings.embedding_cache_ttl_days * 24 * 60 * 60
+            )
+        except Exception as e:
+            logger.warning(f"Analysis cache write failed: {e}")
+    
+    async def _attach_embedding(self, structured_analysis: Dict[str, Any]) -> None:
+        """Set "embedding"/"embedding_dimension" from the analysis description, empty on failure"""
+        description = structured_analysis.get("description")
+        if not description:
+            logger.warning("No description to embed")
+            return
+        
+        embedding = []
+        if self.embeddings:
+            try:
+                embedding = await self._embed_description(description)
+            except Exception as embed_error:
+                logger.error(f"Error generating embedding: {embed_error}")
+        else:
+            logger.warning("No embeddings model available, storing empty embedding")
+        structured_analysis["embedding"] = embedding
+        structured_analysis["embedding_dimension"] = len(embedding)
     
     def _create_fraud_analysis_prompt(self, nft_metadata: Dict[str, Any]) -> str:
         """Create a comprehensive prompt for fraud detection analysis"""
-        
-        prompt = f"""
-        You are an expert NFT fraud detection analyst. Analyze this NFT image and respond with ONLY a valid JSON object.
-
-        NFT Metadata:
-        - Title: {nft_metadata.get('title', nft_metadata.get('name', 'Unknown'))}
-        - Creator: {nft_metadata.get('creator', 'Unknown')}
-        - Collection: {nft_metadata.get('collection', nft_metadata.get('category', 'Unknown'))}
-        - Description: {nft_metadata.get('description', 'No description provided')}
-        - Category: {nft_metadata.get('category', 'Unknown')}
-
-        CRITICAL: Respond with ONLY valid JSON. No text before or after. No markdown formatting.
-
-        Required JSON structure:
-        {{
-            "description": "Detailed visual description of the image (200+ words). Include all visual elements, colors, composition, style, textures, lighting, perspective, text, symbols. Describe artistic technique, medium, and aesthetic quality.",
-            "artistic_style": "Art style classification (e.g., pixel art, 3D render, photography, digital art, oil painting, watercolor)",
-            "quality_assessment": "Image quality rating (1-10) with technical analysis of resolution, color depth, compression artifacts, production value",
-            "fraud_indicators": {{
-                "low_effort_generation": {{
-                    "detected": false,
-                    "confidence": 0.0,
-                    "evidence": "Analysis of effort level, complexity, originality, artistic merit"
-                }},
-                "stolen_artwork": {{
-                    "detected": false,
-                    "confidence": 0.0,
-                    "evidence": "Analysis of watermarks, signatures, style inconsistencies, plagiarism signs"
-                }},
-                "ai_generated": {{
-                    "detected": false,
-                    "confidence": 0.0,
-                    "evidence": "Identification of AI generation artifacts, unnatural patterns, AI-generated characteristics"
-                }},
-                "template_usage": {{
-                    "detected": false,
-                    "confidence": 0.0,
-                    "evidence": "Detection of generic templates, common patterns, mass-produced elements"
-                }},
-                "metadata_mismatch": {{
-                    "detected": false,
-                    "confidence": 0.0,
-                    "evidence": "Analysis of whether image content matches claimed title, description, category"
-                }},
-                "copyright_violation": {{
-                    "detected": false,
-                    "confidence": 0.0,
-                    "evidence": "Signs of copyrighted characters, logos, brands, protected IP"
-                }},
-                "inappropriate_content": {{
-                    "detected": false,
-                    "confidence": 0.0,
-                    "evidence": "Detection of NSFW content, violence, hate speech, inappropriate material"
-                }}
-            }},
-            "overall_fraud_score": 0.0,
-            "risk_level": "low",
-            "key_visual_elements": ["list", "of", "important", "visual", "elements"],
-            "color_palette": ["analysis", "of", "color", "scheme"],
-            "composition_analysis": "Analysis of image composition, layout, focal points, balance, visual hierarchy",
-            "uniqueness_score": 0.0,
-            "artistic_merit": "Assessment of artistic value, creativity, skill level, cultural significance",
-            "technical_quality": "Technical analysis of resolution, file quality, compression, production standards",
-            "market_value_assessment": "Estimation of fair market value based on artistic merit, rarity, market trends",
-            "recommendation": "Clear, actionable recommendation with specific next steps",
-            "confidence_in_analysis": 0.0,
-            "additional_notes": "Additional observations, concerns, or positive aspects"
-        }}
-
-        ANALYSIS REQUIREMENTS:
-        1. Examine image for fraud indicators: plagiarism, AI generation, low effort, stolen content
-        2. Assess artistic quality, originality, and technical merit
-        3. Check for metadata inconsistencies and copyright violations
-        4. Evaluate market value and authenticity indicators
-        5. Provide specific evidence for each fraud indicator
-        6. Calculate overall fraud score (0.0-1.0) based on detected risks
-        7. Determine risk level: low (0.0-0.3), medium (0.3-0.7), high (0.7-1.0)
-        8. Give clear recommendation: ALLOW, FLAG, or BLOCK
-
-        RESPONSE FORMAT:
-        - Return ONLY the JSON object
-        - Use actual numbers for scores (not strings)
-        - Use true/false for boolean values (not "True"/"False")
-        - Ensure JSON is valid and complete
-        - No additional text or formatting
-        """
-        return prompt
+        return _FRAUD_ANALYSIS_PROMPT_TEMPLATE.format(
+            title=nft_metadata.get('title', nft_metadata.get('name', 'Unknown')),
+            creator=nft_metadata.get('creator', 'Unknown'),
+            collection=nft_metadata.get('collection', nft_metadata.get('category', 'Unknown')),
+            description=nft_metadata.get('description', 'No description provided'),
+            category=nft_metadata.get('category', 'Unknown')
+        )
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP client and analysis cache, stop the embedding batcher and image workers"""
+        await self._embedding_batcher.close()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self._disk_cache is not None:
+            self._disk_cache.close()
+        if self._image_pool is not None:
+            self._image_pool.shutdown(wait=False, cancel_futures=True)
+            self._image_pool = None
     
     async def _download_image(self, image_url: str) -> Optional[str]:
         """Download image and convert to base64"""
         try:
-            if not requests or not Image:
-                logger.warning("Required dependencies (requests, PIL) not available")
+            if not httpx or not Image:
+                logger.warning("Required dependencies (httpx, PIL) not available")
                 return None
             
-            logger.info(f"Downloading image from: {image_url}")
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            logger.info(f"Image downloaded successfully, size: {len(response.content)} bytes")
-            
-            # Process image
-            image = Image.open(BytesIO(response.content))
-            logger.info(f"Image opened successfully, format: {image.format}, size: {image.size}, mode: {image.mode}")
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                logger.info(f"Converting image from {image.mode} to RGB")
-                image = image.convert('RGB')
-            
-            # Resize if too large (Gemini has size limits)
-            max_size = (1024, 1024)
-            if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-                logger.info(f"Resizing image from {image.size} to max {max_size}")
-                image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            if self._http_client is None:
+                self._http_client = httpx.AsyncClient(
+                    timeout=30,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+                )
             
-            # Convert to base64
-            buffer = BytesIO()
-            image.save(buffer, format='JPEG', quality=85)
-            image_bytes = buffer.getvalue()
+            logger.info(f"Downloading image from: {image_url}")
+            content = await self._read_capped(image_url, settings.image_max_bytes)
+            if content is None:
+                return None
             
-            base64_data = base64.b64encode(image_bytes).decode('utf-8')
+            logger.info(f"Image downloaded successfully, size: {len(content)} bytes")
+            
+            base64_data = None
+            # A small JPEG usually goes out unchanged, and confirming that (magic bytes,
+            # then a header-only parse) takes microseconds, so it runs inline
+            if content[:3] == JPEG_MAGIC and len(content) <= JPEG_PASSTHROUGH_MAX_BYTES:
+                base64_data = jpeg_passthrough(Image.open(BytesIO(content)), content, settings.gemini_vision_max_edge)
+            if base64_data is None:
+                # Decoding, resizing and re-encoding hold the GIL; a process pool spreads
+                # them over all cores and keeps them off the event loop
+                if self._image_pool is None:
+                    self._image_pool = ProcessPoolExecutor(mp_context=_image_pool_context())
+                base64_data = await asyncio.get_running_loop().run_in_executor(
+                    self._image_pool, encode_image, content,
+                    settings.gemini_vision_max_edge, settings.gemini_vision_jpeg_quality
+                )
             logger.info(f"Image converted to base64, length: {len(base64_data)}")
             
             return base64_data
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Network error downloading image: {e}")
             return None
         except Exception as e:
@@ -369,59 +572,19 @@ class GeminiImageAnalyzer:
             response_text = response_text.strip()
             logger.info(f"Parsing Gemini response, length: {len(response_text)}")
             
-            # Try multiple JSON extraction strategies
-            json_text = None
+            # Single pass over the text finds the JSON object wherever it sits
+            # (bare, inside a ```json fence, or wrapped in prose)
+            json_text = extract_json_object(response_text)
             parsed = None
-            
-            # Strategy 1: Look for JSON between curly braces (most common)
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}')
-            
-            if start_idx >= 0 and end_idx > start_idx:
-                potential_json = response_text[start_idx:end_idx + 1]
-                try:
-                    parsed = json.loads(potential_json)
-                    json_text = potential_json
-                    logger.info("Successfully parsed JSON using curly brace extraction")
-                except json.JSONDecodeError as e:
-                    logger.warning(f"JSON parsing failed for curly brace extraction: {e}")
-            
-            # Strategy 2: Look for JSON with markdown code blocks
-            if not json_text:
-                import re
-                json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
-                matches = re.findall(json_pattern, response_text, re.DOTALL)
-                if matches:
-                    try:
-                        parsed = json.loads(matches[0])
-                        json_text = matches[0]
-                        logger.info("Successfully parsed JSON using markdown code block extraction")
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"JSON parsing failed for markdown extraction: {e}")
-            
-            # Strategy 3: Try to extract JSON from the entire response
-            if not json_text:
-                # Remove common prefixes and suffixes
-                cleaned_text = response_text
-                prefixes_to_remove = ['Here is the analysis:', 'Analysis:', 'JSON:', '```json', '```', 'Response:', 'Result:']
-                for prefix in prefixes_to_remove:
-                    if cleaned_text.startswith(prefix):
-                        cleaned_text = cleaned_text[len(prefix):].strip()
-                
-                suffixes_to_remove = ['```', 'End of analysis', 'Analysis complete', 'End', 'Complete']
-                for suffix in suffixes_to_remove:
-                    if cleaned_text.endswith(suffix):
-                        cleaned_text = cleaned_text[:-len(suffix)].strip()
-                
+            if json_text:
                 try:
-                    parsed = json.loads(cleaned_text)
-                    json_text = cleaned_text
-                    logger.info("Successfully parsed JSON using full response extraction")
-                except json.JSONDecodeError as e:
-                    logger.warning(f"JSON parsing failed for full response extraction: {e}")
+                    parsed = orjson.loads(json_text)
+                    logger.info("Successfully parsed JSON from Gemini response")
+                except orjson.JSONDecodeError as e:
+                    logger.warning(f"JSON parsing failed for extracted object: {e}")
             
             # If we found valid JSON, process it
-            if json_text and parsed:
+            if isinstance(parsed, dict) and parsed:
                 # Validate and fix required fields
                 if not parsed.get("description"):
                     # Extract description from the original response if not in JSON
@@ -430,14 +593,8 @@ class GeminiImageAnalyzer:
                     logger.info("Extracted description from text response")
                 
                 # Ensure all required fraud indicators exist with proper structure
-                required_indicators = [
-                    "low_effort_generation", "stolen_artwork", "ai_generated", 
-                    "template_usage", "metadata_mismatch", "copyright_violation", 
-                    "inappropriate_content"
-                ]
-                
                 fraud_indicators = parsed.get("fraud_indicators", {})
-                for indicator in required_indicators:
+                for indicator in REQUIRED_FRAUD_INDICATORS:
                     if indicator not in fraud_indicators:
                         fraud_indicators[indicator] = {
                             "detected": False,
@@ -475,28 +632,16 @@ class GeminiImageAnalyzer:
                     parsed["risk_level"] = "low"
                 
                 # Ensure other required fields exist with proper types
-                required_fields = {
-                    "artistic_style": "unknown",
-                    "quality_assessment": "Analysis completed",
-                    "key_visual_elements": [],
-                    "color_palette": [],
-                    "composition_analysis": "Analysis completed",
-                    "uniqueness_score": 0.0,
-                    "artistic_merit": "Analysis completed",
-                    "technical_quality": "Analysis completed",
-                    "market_value_assessment": "Analysis completed",
-                    "recommendation": "ALLOW" if fraud_score < 0.3 else "FLAG" if fraud_score < 0.7 else "BLOCK",
-                    "confidence_in_analysis": 0.8,
-                    "additional_notes": "Analysis completed successfully"
-                }
-                
-                for field, default_value in required_fields.items():
+                for field, default_value in REQUIRED_ANALYSIS_FIELDS.items():
                     if field not in parsed:
                         parsed[field] = default_value
-                    elif field in ["key_visual_elements", "color_palette"] and not isinstance(parsed[field], list):
-                        parsed[field] = default_value
-                    elif field in ["uniqueness_score", "confidence_in_analysis"] and not isinstance(parsed[field], (int, float)):
+                    elif field in NUMERIC_ANALYSIS_FIELDS and not isinstance(parsed[field], (int, float)):
                         parsed[field] = default_value
+                for field in LIST_ANALYSIS_FIELDS:
+                    if not isinstance(parsed.get(field), list):
+                        parsed[field] = []
+                if "recommendation" not in parsed:
+                    parsed["recommendation"] = "ALLOW" if fraud_score < 0.3 else "FLAG" if fraud_score < 0.7 else "BLOCK"
                 
                 logger.info(f"Successfully processed JSON response with fraud score: {parsed['overall_fraud_score']}")
                 return parsed
@@ -664,120 +809,23 @@ class GeminiImageAnalyzer:
     
     def _create_error_response(self, error_message: str) -> Dict[str, Any]:
         """Create a standardized error response"""
-        return {
-            "description": f"Error analyzing image: {error_message}",
-            "artistic_style": "unknown",
-            "quality_assessment": "Analysis failed",
-            "fraud_indicators": {
-                "low_effort_generation": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "stolen_artwork": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "ai_generated": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "template_usage": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "metadata_mismatch": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "copyright_violation": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "inappropriate_content": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                }
-            },
-            "overall_fraud_score": 0.0,
-            "risk_level": "unknown",
-            "key_visual_elements": [],
-            "color_palette": [],
-            "composition_analysis": "Analysis failed",
-            "uniqueness_score": 0.0,
-            "artistic_merit": "Analysis failed",
-            "technical_quality": "Analysis failed",
-            "market_value_assessment": "Analysis failed",
-            "recommendation": "Manual review required - Analysis error",
-            "confidence_in_analysis": 0.0,
-            "additional_notes": f"Error: {error_message}"
-        }
+        result = orjson.loads(_ERROR_ANALYSIS_JSON)
+        result["description"] = f"Error analyzing image: {error_message}"
+        result["additional_notes"] = f"Error: {error_message}"
+        return result
     
     def _create_error_analysis_result(self, error_message: str) -> Dict[str, Any]:
         """Return error analysis result when analysis fails"""
-        return {
+        result = orjson.loads(_ERROR_ANALYSIS_JSON)
+        result.update({
             "description": f"Analysis failed: {error_message}",
-            "artistic_style": "unknown",
-            "quality_assessment": "Analysis failed",
-            "fraud_indicators": {
-                "low_effort_generation": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "stolen_artwork": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "ai_generated": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "template_usage": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "metadata_mismatch": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "copyright_violation": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                },
-                "inappropriate_content": {
-                    "detected": False,
-                    "confidence": 0.0,
-                    "evidence": "Analysis failed"
-                }
-            },
-            "overall_fraud_score": 0.0,
-            "risk_level": "unknown",
-            "key_visual_elements": [],
-            "color_palette": [],
-            "composition_analysis": "Analysis failed",
-            "uniqueness_score": 0.0,
-            "artistic_merit": "Analysis failed",
-            "technical_quality": "Analysis failed",
-            "market_value_assessment": "Analysis failed",
             "recommendation": "Manual review required - Analysis failed",
-            "confidence_in_analysis": 0.0,
             "additional_notes": f"Error: {error_message}",
             "embedding": [],
             "embedding_dimension": 0,
             "error": error_message
-        }
+        })
+        return result
     
     async def extract_image_description(self, image_url: str) -> str:
         """Extract simple description for embedding (simplified version)"""
@@ -812,7 +860,7 @@ class GeminiImageAnalyzer:
                 ]
             )
             
-            response = await self.gemini_chat.ainvoke([message])
+            response = await call_gemini(self.gemini_chat.ainvoke, [message])
             description = response.content.strip()
             logger.info("=" * 80)
             logger.info("RAW GEMINI DESCRIPTION RESPONSE:")
@@ -830,14 +878,31 @@ class GeminiImageAnalyzer:
             logger.error(f"Error extracting image description: {e}")
             raise e
     
+    async def _embed_description(self, text: str) -> List[float]:
+        """Normalized embedding of text, reused from the LRU when the same text was embedded before"""
+        key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        cached = self._description_embeddings.get(key)
+        if cached is not None:
+            return cached.tolist()
+        
+        embedding = await self._embedding_batcher.submit(text)
+        self._description_embeddings[key] = np.asarray(embedding, dtype=np.float32)
+        return embedding
+    
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts with one API call"""
+        # aembed_documents defaults to the document task type; keep aembed_query's so
+        # batched embeddings stay comparable with the ones already stored
+        embeddings = await call_gemini(self.embeddings.aembed_documents, texts, task_type="RETRIEVAL_QUERY")
+        return [normalize_embedding(embedding) for embedding in embeddings]
+    
     async def embed_text(self, text: str) -> List[float]:
         """Generate embeddings for text using Google embeddings"""
         try:
             if not self.embeddings:
                 raise Exception("Gemini embeddings model not available")
             
-            embedding = await self.embeddings.aembed_query(text)
-            return embedding
+            return await self._embed_description(text)
             
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
@@ -849,8 +914,9 @@ class GeminiImageAnalyzer:
             if not self.embeddings:
                 raise Exception("Gemini embeddings model not available")
             
-            embeddings = await self.embeddings.aembed_documents(texts)
-            return embeddings
+            # Same task type as embed_text, so batch and single vectors share one space
+            embeddings = await call_gemini(self.embeddings.aembed_documents, texts, task_type="RETRIEVAL_QUERY")
+            return [normalize_embedding(embedding) for embedding in embeddings]
             
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
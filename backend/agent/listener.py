@@ -10,12 +10,12 @@ from datetime import datetime
 try:
     from core.config import settings
     from agent.sui_client import sui_client, NFTData
-    from agent.fraud_detector import analyze_nft_for_fraud, NFTData as FraudDetectorNFTData
+    from agent.fraud_detector import analyze_nft_for_fraud, index_nft_embedding, NFTData as FraudDetectorNFTData
     from agent.supabase_client import supabase_client
 except ImportError:
     from backend.core.config import settings
     from backend.agent.sui_client import sui_client, NFTData
-    from backend.agent.fraud_detector import analyze_nft_for_fraud, NFTData as FraudDetectorNFTData
+    from backend.agent.fraud_detector import analyze_nft_for_fraud, index_nft_embedding, NFTData as FraudDetectorNFTData
     from backend.agent.supabase_client import supabase_client
 
 logger = logging.getLogger(__name__)
@@ -184,10 +184,14 @@ class SuiEventListener:
                     })
                     
                     # Update embedding vector if available
+                    embedding_updated = False
                     if "image_analysis" in fraud_result.get("analysis_details", {}) and "embedding" in fraud_result["analysis_details"]["image_analysis"]:
                         nft.embedding_vector = fraud_result["analysis_details"]["image_analysis"]["embedding"]
+                        embedding_updated = True
                     
                     db.commit()
+                    if embedding_updated:
+                        index_nft_embedding(nft)
                     logger.info(f"Updated NFT {nft.id} with analysis results from listener")
                 else:
                     logger.warning(f"NFT with Sui object ID {nft_data.object_id} not found in database")
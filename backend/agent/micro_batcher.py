@@ -0,0 +1,101 @@
+"""
+Dynamic micro-batcher for FraudGuard
+Collects concurrent requests for a few milliseconds and hands them to a batch
+handler together, so bursts of analyses share one upstream call
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Groups items submitted within max_wait seconds (up to batch_size) into one handler call"""
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        batch_size: int = 16,
+        max_wait: float = 0.02
+    ):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its entry in the handler's result list"""
+        if self._task is None or self._task.done():
+            # Started lazily so the queue and task belong to the running loop
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def close(self) -> None:
+        """Stop the collector task after in-flight batches finish; items still queued are cancelled"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    async def _run(self) -> None:
+        """Collect items until the batch is full or max_wait elapses, then dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            try:
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Closing mid-collection: release callers of the partial batch
+                for _, future in batch:
+                    future.cancel()
+                raise
+
+            # Dispatch without blocking collection of the next batch
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Run the handler on one batch and resolve each caller's future"""
+        items = [item for item, _ in batch]
+        try:
+            results = await self.handler(items)
+            if len(results) != len(items):
+                raise ValueError(f"Batch handler returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(items)} items: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,165 @@
+"""
+In-process FAISS HNSW index over NFT embeddings for FraudGuard
+Serves the fraud detector's nearest-neighbour lookups from memory instead of
+running a KNN query against the nfts table on every analysis
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    from models.database import NFT
+    from database import connection as db_connection
+except ImportError:
+    from backend.models.database import NFT
+    from backend.database import connection as db_connection
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSION = 768
+# SQ8 needs per-dimension ranges learned from data; below this many vectors the
+# ranges are unreliable and a flat index is small anyway
+SQ_MIN_TRAINING_VECTORS = 1000
+SQ_TRAINING_SAMPLE_SIZE = 100_000
+
+
+class NFTVectorIndex:
+    """
+    HNSW graph (inner product over unit-normalized embeddings) plus a row
+    position -> NFT map. Built once from the database, then kept current via add().
+    Vectors are stored as 8-bit scalar-quantized codes once there are enough to
+    train the quantizer, a quarter of the float32 footprint.
+    """
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, m: int = 32,
+                 ef_construction: int = 200, ef_search: int = 64):
+        self.dimension = dimension
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._index = None
+        self._nfts: List[Dict[str, Any]] = []
+        self._latest: Dict[Any, int] = {}  # NFT id -> position of its current embedding
+        # FAISS indexes are not safe for concurrent add/search
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return faiss is not None
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def _new_index(self, vectors: np.ndarray):
+        if len(vectors) >= SQ_MIN_TRAINING_VECTORS:
+            index = faiss.IndexHNSWSQ(
+                self.dimension, faiss.ScalarQuantizer.QT_8bit, self.m, faiss.METRIC_INNER_PRODUCT
+            )
+            sample = vectors
+            if len(vectors) > SQ_TRAINING_SAMPLE_SIZE:
+                rng = np.random.default_rng()
+                sample = vectors[rng.choice(len(vectors), SQ_TRAINING_SAMPLE_SIZE, replace=False)]
+            index.train(sample)
+        else:
+            index = faiss.IndexHNSWFlat(self.dimension, self.m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.ef_construction
+        index.hnsw.efSearch = self.ef_search
+        return index
+
+    def build(self) -> int:
+        """Load every stored embedding and (re)build the index. Blocking; returns the vector count"""
+        if not self.available:
+            return 0
+        if not db_connection.db_available or not db_connection.SessionLocal:
+            logger.warning("NFT vector index not built - database not available")
+            return 0
+
+        db = db_connection.SessionLocal()
+        try:
+            rows = db.execute(
+                select(NFT.id, NFT.title, NFT.image_url, NFT.creator_wallet_address, NFT.embedding_vector)
+                .where(NFT.embedding_vector.isnot(None))
+            ).all()
+        finally:
+            db.close()
+
+        vectors = np.asarray([row.embedding_vector for row in rows], dtype=np.float32).reshape(-1, self.dimension)
+        index = self._new_index(vectors)
+        nfts = [self._nft_entry(row.id, row.title, row.image_url, row.creator_wallet_address) for row in rows]
+        if rows:
+            index.add(vectors)
+
+        with self._lock:
+            self._index = index
+            self._nfts = nfts
+            self._latest = {nft["id"]: position for position, nft in enumerate(nfts)}
+        logger.info(f"Built NFT vector index with {len(nfts)} embeddings")
+        return len(nfts)
+
+    def add(self, nft_id: Any, embedding: Any, title: str, image_url: str, creator_wallet_address: str) -> None:
+        """Add a newly stored embedding so later lookups see it without a rebuild"""
+        if not self.ready or embedding is None:
+            return
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        if vector.shape[1] != self.dimension:
+            return
+        with self._lock:
+            self._index.add(vector)
+            self._latest[nft_id] = len(self._nfts)
+            self._nfts.append(self._nft_entry(nft_id, title, image_url, creator_wallet_address))
+
+    def search(self, embedding: Any, k: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return up to k nearest NFTs as rows shaped like the SQL similarity query
+        (id, title, image_url, creator_wallet_address, similarity), or None if not built
+        """
+        results = self.search_many(np.asarray(embedding, dtype=np.float32).reshape(1, -1), k)
+        return results[0] if results is not None else None
+
+    def search_many(self, embeddings: np.ndarray, k: int = 10) -> Optional[List[List[Dict[str, Any]]]]:
+        """
+        search() for a (n, dimension) batch of queries in one FAISS call, which
+        spreads the queries across FAISS's worker threads. Returns one row list per query
+        """
+        if not self.ready:
+            return None
+        queries = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with self._lock:
+            # Over-fetch: an NFT re-embedded via add() keeps a stale entry in the graph
+            scores, positions = self._index.search(queries, k * 2)
+            nfts = self._nfts
+            latest = self._latest
+
+        results = []
+        for query_scores, query_positions in zip(scores, positions):
+            rows = []
+            for score, position in zip(query_scores, query_positions):
+                if position < 0:
+                    continue
+                nft = nfts[position]
+                if latest.get(nft["id"]) != position:
+                    continue
+                # Inner product of unit vectors is the cosine similarity itself
+                rows.append({**nft, "similarity": float(score)})
+                if len(rows) == k:
+                    break
+            results.append(rows)
+        return results
+
+    @staticmethod
+    def _nft_entry(nft_id: Any, title: str, image_url: str, creator_wallet_address: str) -> Dict[str, Any]:
+        return {
+            "id": nft_id,
+            "title": title,
+            "image_url": image_url,
+            "creator_wallet_address": creator_wallet_address
+        }
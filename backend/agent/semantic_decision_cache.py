@@ -0,0 +1,84 @@
+"""
+Semantic cache for LLM fraud decisions
+Reuses a previous decision for an NFT with the same metadata and a near-identical
+image embedding, so re-submissions and rescans skip the Gemini decision call
+"""
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DECISION_CACHE_SIZE = 10_000
+DECISION_CACHE_TTL_SECONDS = 24 * 60 * 60
+DECISION_CACHE_THRESHOLD = 0.95
+# Decisions stored per metadata hash; older ones are dropped first
+MAX_ENTRIES_PER_KEY = 8
+
+
+def quantize_int8(embedding: Any) -> Tuple[np.ndarray, float]:
+    """Symmetric per-vector int8 quantization: (codes, scale) with embedding ~= codes * scale"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    scale = float(np.max(np.abs(vector))) / 127.0 or 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+def metadata_hash(fields: Iterable[Any]) -> str:
+    """SHA-256 over the normalized (stripped, lower-cased) metadata fields"""
+    normalized = "\x1f".join(str(value or "").strip().lower() for value in fields)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class SemanticDecisionCache:
+    """
+    Two-tier lookup: the exact metadata hash selects the candidate entries, then
+    the image embedding must reach the cosine threshold against one of them.
+    Embeddings are unit-normalized, so cosine similarity is a dot product.
+    Stored embeddings are int8-quantized with a per-vector scale, a quarter of the
+    float32 footprint; for 768-d unit vectors the rounding typically shifts a
+    similarity by under 0.001.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DECISION_CACHE_SIZE,
+        ttl_seconds: float = DECISION_CACHE_TTL_SECONDS,
+        threshold: float = DECISION_CACHE_THRESHOLD
+    ):
+        self.threshold = threshold
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+
+    def lookup(self, embedding: Any, meta_hash: str) -> Optional[Dict[str, Any]]:
+        """Return a cached decision for this metadata and a near-identical image, if any"""
+        if embedding is None or len(embedding) == 0:
+            return None
+        with self._lock:
+            entries: List[Tuple[np.ndarray, float, Dict[str, Any]]] = self._entries.get(meta_hash)
+            if not entries:
+                return None
+            entries = list(entries)
+
+        query = np.asarray(embedding, dtype=np.float32)
+        codes = np.stack([entry_codes for entry_codes, _, _ in entries])
+        scales = np.fromiter((scale for _, scale, _ in entries), dtype=np.float32, count=len(entries))
+        similarities = (codes.astype(np.float32) @ query) * scales
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        logger.info(f"Semantic decision cache hit (similarity {similarities[best]:.3f})")
+        return dict(entries[best][2])
+
+    def put(self, embedding: Any, meta_hash: str, decision: Dict[str, Any]) -> None:
+        """Store a decision under its metadata hash and image embedding"""
+        if embedding is None or len(embedding) == 0:
+            return
+        codes, scale = quantize_int8(embedding)
+        with self._lock:
+            entries = self._entries.get(meta_hash, [])
+            # Re-assigning refreshes the TTL for this metadata
+            self._entries[meta_hash] = (entries + [(codes, scale, dict(decision))])[-MAX_ENTRIES_PER_KEY:]
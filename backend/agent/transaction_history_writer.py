@@ -0,0 +1,151 @@
+"""
+Batched transaction history writer for FraudGuard
+Takes transaction_history rows off the request path and inserts them in batches
+from a background task, so each listing/purchase only pays for its critical UPDATE
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+try:
+    from models.database import TransactionHistory
+    from database import connection as db_connection
+except ImportError:
+    from backend.models.database import TransactionHistory
+    from backend.database import connection as db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionHistoryWriter:
+    """Queues transaction_history rows and writes them with one INSERT per batch"""
+
+    def __init__(self, batch_size: int = 50, flush_interval: float = 0.1,
+                 max_retries: int = 4, retry_delay: float = 0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.is_running = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> bool:
+        """Start the background flusher. Returns False when the database is unavailable"""
+        if self.is_running:
+            return True
+        if not db_connection.db_available or not db_connection.SessionLocal:
+            logger.warning("Transaction history writer not started - database not available")
+            return False
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        self.is_running = True
+        logger.info("Transaction history writer started")
+        return True
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        """
+        Queue a transaction_history row (column name -> value) for the next batch.
+        Safe from any thread: submissions usually come from after_commit hooks
+        running in FastAPI's threadpool, so the put is scheduled on the writer's loop
+        """
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, row)
+
+    async def stop(self) -> None:
+        """Stop the flusher after it has written every row queued so far"""
+        if not self.is_running:
+            return
+        self.is_running = False
+
+        # Sentinel: the flusher writes everything queued before it, then exits
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        logger.info("Transaction history writer stopped")
+
+    async def _run(self) -> None:
+        """Collect rows until the batch is full or flush_interval elapses, then write them"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Write a batch, retrying with exponential backoff. The listings and purchases
+        behind these rows have already committed, so a transient database error
+        must not lose them: the failed batch is retried ahead of newer rows, and
+        only then split into per-row inserts so one bad row cannot sink the rest
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Giving up on batch insert of {len(batch)} transaction history rows: {e}")
+                    break
+                delay = min(self.retry_delay * 2 ** attempt, 10.0)
+                logger.warning(f"Error writing {len(batch)} transaction history rows ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        failed = await asyncio.to_thread(self._write_rows, batch)
+        for row, error in failed:
+            logger.error(f"Could not write transaction history row {row}: {error}")
+
+    def _write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert a batch of rows in a single executemany + commit; raises on failure"""
+        db = db_connection.SessionLocal()
+        try:
+            db.execute(insert(TransactionHistory), rows)
+            db.commit()
+            logger.debug(f"Wrote {len(rows)} transaction history rows")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Exception]]:
+        """Insert rows one at a time, returning the rows that failed with their errors"""
+        failed = []
+        db = db_connection.SessionLocal()
+        try:
+            for row in rows:
+                try:
+                    db.execute(insert(TransactionHistory), [row])
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    failed.append((row, e))
+        finally:
+            db.close()
+        return failed
+
+
+# Global writer instance
+transaction_history_writer = TransactionHistoryWriter()
@@ -328,7 +328,7 @@ async def create_listing(
             
             existing_cancelled_listing.price = listing_data.price
             existing_cancelled_listing.expires_at = listing_data.expires_at
-            existing_cancelled_listing.listing_metadata = listing_data.listing_metadata
+            existing_cancelled_listing.listing_metadata = listing_data.listing_metadata or {}
             existing_cancelled_listing.status = "active"
             existing_cancelled_listing.updated_at = datetime.utcnow()
             
@@ -348,7 +348,7 @@ async def create_listing(
                 seller_wallet_address=nft.owner_wallet_address,
                 price=listing_data.price,
                 expires_at=listing_data.expires_at,
-                listing_metadata=listing_data.listing_metadata,
+                listing_metadata=listing_data.listing_metadata or {},
                 status="active"
             )
 
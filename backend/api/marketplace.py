@@ -36,6 +36,10 @@ except ImportError:
             db = SessionLocal()
             try:
                 yield db
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
             finally:
                 db.close()
         
@@ -36,11 +36,13 @@ try:
     from agent.fraud_detector import analyze_nft_for_fraud, NFTData
     from agent.supabase_client import supabase_client
     from agent.clip_embeddings import get_embedding_service
+    from agent.gemini_image_analyzer import to_vector_literal
 except ImportError:
     try:
         from backend.agent.fraud_detector import analyze_nft_for_fraud, NFTData
         from backend.agent.supabase_client import supabase_client
         from backend.agent.clip_embeddings import get_embedding_service
+        from backend.agent.gemini_image_analyzer import to_vector_literal
     except ImportError:
         logger.warning("Could not import AI services - analysis will not be available")
         def analyze_nft_for_fraud(nft_data):
@@ -57,6 +59,8 @@ except ImportError:
         supabase_client = None
         def get_embedding_service():
             return None
+        def to_vector_literal(embedding):
+            return f"[{','.join(map(str, embedding))}]"
 
 # Import database models
 try:
@@ -1006,7 +1010,7 @@ async def analyze_external_nft_with_db_update(notification: NFTMintedNotificatio
             
             if embedding_service:
                 image_embedding = await embedding_service.get_image_embedding(notification.image_url)
-                if image_embedding:
+                if image_embedding is not None:
                     logger.info(f"Successfully generated description-based embedding for external NFT")
                 else:
                     logger.warning("Failed to generate description-based embedding for external NFT")
@@ -1066,7 +1070,7 @@ async def search_similar_nfts(
             raise HTTPException(status_code=500, detail="Image embedding service not available")
         
         query_embedding = await embedding_service.get_image_embedding(image_url)
-        if not query_embedding:
+        if query_embedding is None:
             raise HTTPException(status_code=400, detail="Failed to generate embedding for query image")
         
         # Use Supabase to find similar images directly
@@ -1376,16 +1380,16 @@ async def get_similar_nfts(
                 title,
                 image_url,
                 creator_wallet_address,
-                embedding_vector <=> :embedding as distance
+                -(embedding_vector <#> :embedding) as similarity
             FROM nfts 
             WHERE embedding_vector IS NOT NULL 
             AND id != :current_nft_id
-            ORDER BY embedding_vector <=> :embedding
+            ORDER BY embedding_vector <#> :embedding
             LIMIT :limit
         """)
         
         # Convert embedding to PostgreSQL vector format
-        embedding_str = f"[{','.join(map(str, target_nft.embedding_vector))}]"
+        embedding_str = to_vector_literal(target_nft.embedding_vector)
         
         result = db.execute(query, {
             "embedding": embedding_str,
@@ -1395,9 +1399,8 @@ async def get_similar_nfts(
         
         similar_nfts = []
         for row in result:
-            # Convert distance to similarity (1 - distance)
-            distance = float(row.distance)
-            similarity = 1.0 - distance
+            # Unit-normalized embeddings: the negated inner product is the cosine similarity
+            similarity = float(row.similarity)
             
             if similarity >= 0.7:  # Threshold for similar NFTs
                 try:
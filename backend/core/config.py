@@ -38,6 +38,16 @@ class Settings(BaseSettings):
     gemini_embedding_model: str = Field(default="models/embedding-001", env="GEMINI_EMBEDDING_MODEL")
     gemini_temperature: float = Field(default=0.1, env="GEMINI_TEMPERATURE")
     gemini_max_tokens: int = Field(default=1000, env="GEMINI_MAX_TOKENS")
+    gemini_max_concurrency: int = Field(default=8, env="GEMINI_MAX_CONCURRENCY")
+    gemini_max_retries: int = Field(default=4, env="GEMINI_MAX_RETRIES")
+    gemini_response_timeout_seconds: float = Field(default=30.0, env="GEMINI_RESPONSE_TIMEOUT_SECONDS")
+    gemini_vision_max_edge: int = Field(default=512, env="GEMINI_VISION_MAX_EDGE")
+    gemini_vision_jpeg_quality: int = Field(default=75, env="GEMINI_VISION_JPEG_QUALITY")
+    image_max_bytes: int = Field(default=8 * 1024 * 1024, env="IMAGE_MAX_BYTES")
+    # On-disk cache of image analyses, shared across restarts; unset disables it
+    embedding_cache_dir: Optional[str] = Field(default=None, env="EMBEDDING_CACHE_DIR")
+    embedding_cache_size_limit_mb: int = Field(default=2048, env="EMBEDDING_CACHE_SIZE_LIMIT_MB")
+    embedding_cache_ttl_days: int = Field(default=30, env="EMBEDDING_CACHE_TTL_DAYS")
 
     # Supabase Configuration
     supabase_url: Optional[str] = Field(default=None, env="SUPABASE_URL")
@@ -45,6 +55,15 @@ class Settings(BaseSettings):
     supabase_db_url: Optional[str] = Field(default=None, env="SUPABASE_DB_URL")
     supabase_db_password: Optional[str] = Field(default=None, env="SUPABASE_DB_PASSWORD")
 
+    # Database Connection Pool Configuration
+    db_pool_size: int = Field(default=20, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=30, env="DB_MAX_OVERFLOW")
+    db_pool_recycle_seconds: int = Field(default=1800, env="DB_POOL_RECYCLE_SECONDS")
+    db_pool_timeout_seconds: int = Field(default=30, env="DB_POOL_TIMEOUT_SECONDS")
+    vector_pool_min_size: int = Field(default=5, env="VECTOR_POOL_MIN_SIZE")
+    vector_pool_max_size: int = Field(default=20, env="VECTOR_POOL_MAX_SIZE")
+    vector_ef_search: int = Field(default=40, env="VECTOR_EF_SEARCH")
+
     # Pinata IPFS Configuration
     pinata_api_key: Optional[str] = Field(default=None, env="PINATA_API_KEY")
     pinata_secret_api_key: Optional[str] = Field(default=None, env="PINATA_SECRET_API_KEY")
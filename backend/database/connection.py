@@ -3,7 +3,7 @@ Database connection and session management for FraudGuard
 """
 import os
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 from models.database import Base
@@ -21,8 +21,37 @@ db_available = False
 
 # Try to create database connection
 try:
-    engine = create_engine(DATABASE_URL, echo=settings.debug)
+    engine = create_engine(
+        DATABASE_URL,
+        echo=settings.debug,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=True  # Drop stale connections before use instead of failing the request
+    )
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    @event.listens_for(engine, "connect")
+    def _register_vector_codec(dbapi_connection, connection_record):
+        """Teach each new psycopg2 connection to adapt numpy arrays to and from pgvector"""
+        try:
+            from pgvector.psycopg2 import register_vector
+            register_vector(dbapi_connection)
+        except Exception as codec_error:
+            # Extension missing or pgvector not installed: fall back to text literals
+            dbapi_connection.rollback()
+            logger.debug(f"pgvector codec not registered: {codec_error}")
+
+        if settings.vector_ef_search != 40:  # pgvector's default
+            # Session-level, committed so pool rollbacks keep it
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute(f"SET hnsw.ef_search = {int(settings.vector_ef_search)}")
+                dbapi_connection.commit()
+            finally:
+                cursor.close()
+
     db_available = True
     logger.info("Database connection established")
 except Exception as e:
@@ -30,7 +59,11 @@ except Exception as e:
     logger.info("Running in database-less mode")
 
 def get_db():
-    """Dependency to get database session"""
+    """
+    Dependency to get database session.
+    The request is one unit of work: commit once when the endpoint succeeds,
+    roll back if it raises.
+    """
     if not db_available or not SessionLocal:
         logger.error("Database not available - cannot create session")
         raise Exception("Database connection not available")
@@ -38,6 +71,10 @@ def get_db():
     db = SessionLocal()
     try:
         yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Database migration script for FraudGuard
-Adds missing fields to transaction_history table
+Runs a SQL file from database/migrations (default: add_transaction_fields.sql)
+
+Usage: python migrate.py [migration_file.sql]
 """
 
 import os
@@ -9,7 +11,9 @@ import sys
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
-def run_migration():
+DEFAULT_MIGRATION = "add_transaction_fields.sql"
+
+def run_migration(migration_name: str = DEFAULT_MIGRATION):
     """Run the database migration"""
     try:
         # Get database URL from environment
@@ -23,18 +27,24 @@ def run_migration():
         Session = sessionmaker(bind=engine)
         session = Session()
         
-        print("Running transaction_history table migration...")
+        print(f"Running migration {migration_name}...")
         
         # Read migration SQL
-        migration_path = os.path.join(os.path.dirname(__file__), "migrations", "add_transaction_fields.sql")
+        migration_path = os.path.join(os.path.dirname(__file__), "migrations", migration_name)
         with open(migration_path, 'r') as f:
             migration_sql = f.read()
         
+        # Drop full-line comments first, so header comments (which may contain
+        # semicolons) neither split nor hide the statements that follow them
+        migration_sql = '\n'.join(
+            line for line in migration_sql.splitlines() if not line.lstrip().startswith('--')
+        )
+        
         # Execute migration commands one by one
         commands = migration_sql.split(';')
         for command in commands:
             command = command.strip()
-            if command and not command.startswith('--'):
+            if command:
                 try:
                     session.execute(text(command))
                     session.commit()
@@ -52,6 +62,6 @@ def run_migration():
         return False
 
 if __name__ == "__main__":
-    success = run_migration()
+    success = run_migration(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MIGRATION)
     if not success:
         sys.exit(1)
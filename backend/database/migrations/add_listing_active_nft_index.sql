@@ -0,0 +1,7 @@
+-- At most one active listing per NFT.
+-- The partial unique index backs the (nft_id, status = 'active') lookups used
+-- by the listing write paths and makes duplicate active listings impossible.
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_listings_active_nft
+    ON listings (nft_id)
+    WHERE status = 'active';
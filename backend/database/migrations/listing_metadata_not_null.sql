@@ -0,0 +1,6 @@
+-- listing_metadata is always a JSON object: backfill NULLs, default to '{}'
+-- and forbid NULL so application code can drop its "or {}" guards.
+
+UPDATE listings SET listing_metadata = '{}'::jsonb WHERE listing_metadata IS NULL;
+ALTER TABLE listings ALTER COLUMN listing_metadata SET DEFAULT '{}'::jsonb;
+ALTER TABLE listings ALTER COLUMN listing_metadata SET NOT NULL;
@@ -0,0 +1,46 @@
+-- Unit-normalized embeddings + HNSW inner-product index for similarity search.
+-- Embeddings are now L2-normalized when generated, so the UPDATE backfills
+-- existing rows and inner product (<#>) equals cosine similarity.
+-- The HNSW index turns nearest-neighbour lookups from a full scan into a graph
+-- search; queries must ORDER BY embedding_vector <#> :q to use it, and the
+-- threshold is applied to the top match_count candidates.
+
+UPDATE nfts
+    SET embedding_vector = l2_normalize(embedding_vector)
+    WHERE embedding_vector IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_nfts_embedding_hnsw_ip
+    ON nfts USING hnsw (embedding_vector vector_ip_ops)
+    WITH (m = 16, ef_construction = 64);
+
+DROP FUNCTION IF EXISTS search_similar_nft_embeddings(vector, float, int);
+
+CREATE FUNCTION search_similar_nft_embeddings(
+    query_embedding vector(768),
+    similarity_threshold float,
+    match_count int
+)
+RETURNS TABLE (
+    nft_id uuid,
+    title text,
+    image_url text,
+    creator_wallet_address text,
+    similarity float
+)
+LANGUAGE sql STABLE
+SET hnsw.ef_search = 40
+AS $$
+    SELECT * FROM (
+        SELECT
+            n.id,
+            n.title,
+            n.image_url,
+            n.creator_wallet_address,
+            -(n.embedding_vector <#> query_embedding) AS similarity
+        FROM nfts n
+        WHERE n.embedding_vector IS NOT NULL
+        ORDER BY n.embedding_vector <#> query_embedding
+        LIMIT match_count
+    ) candidates
+    WHERE candidates.similarity >= similarity_threshold
+$$;
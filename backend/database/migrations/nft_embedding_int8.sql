@@ -0,0 +1,9 @@
+-- int8-quantized copy of nfts.embedding_vector (4x smaller than float32).
+-- embedding_int8 holds one signed byte per dimension and embedding_scale the
+-- per-vector max(|v|); v ~= int8 * scale / 127. The application fills both
+-- whenever embedding_vector is written. Existing rows keep NULL codes until
+-- their embedding is regenerated; the local index quantizes those at load time.
+
+ALTER TABLE nfts ADD COLUMN IF NOT EXISTS embedding_int8 bytea;
+
+ALTER TABLE nfts ADD COLUMN IF NOT EXISTS embedding_scale double precision;
@@ -3,7 +3,12 @@ FraudGuard Backend API
 FastAPI application for AI-powered fraud detection in NFT marketplace
 """
 import asyncio
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Dict, List, Optional
 
@@ -11,6 +16,7 @@ from typing import Dict, List, Optional
 try:
     from fastapi import FastAPI, HTTPException, BackgroundTasks
     from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import StreamingResponse
     from pydantic import BaseModel
     import uvicorn
 except ImportError:
@@ -19,6 +25,7 @@ except ImportError:
     HTTPException = None
     BackgroundTasks = None
     CORSMiddleware = None
+    StreamingResponse = None
     BaseModel = None
     uvicorn = None
 
@@ -26,10 +33,11 @@ try:
     # Try relative imports first (when running from backend directory)
     from core.config import settings,validate_ai_config
     from agent.listener import start_fraud_detection_service, stop_fraud_detection_service
+    from agent.transaction_history_writer import transaction_history_writer
     from agent.sui_client import sui_client
     from agent.supabase_client import supabase_client
-    from agent.fraud_detector import analyze_nft_for_fraud, initialize_fraud_detector, NFTData
-    from agent.chat_bot import get_nft_market_analysis, validate_environment
+    from agent.fraud_detector import analyze_nft_for_fraud, initialize_fraud_detector, close_fraud_detector, NFTData
+    from agent.chat_bot import get_nft_market_analysis, stream_nft_market_analysis, CHAT_ENABLED, CHAT_DISABLED_REASON
     from api.marketplace import router as marketplace_router
     from api.nft import router as nft_router
     from api.listings import router as listings_router
@@ -40,10 +48,11 @@ except ImportError:
     # Fallback to absolute imports (when running from project root)
     from backend.core.config import settings,validate_ai_config
     from backend.agent.listener import start_fraud_detection_service, stop_fraud_detection_service
+    from backend.agent.transaction_history_writer import transaction_history_writer
     from backend.agent.sui_client import sui_client
     from backend.agent.supabase_client import supabase_client
-    from backend.agent.fraud_detector import analyze_nft_for_fraud, initialize_fraud_detector, NFTData
-    from backend.agent.chat_bot import get_nft_market_analysis, validate_environment
+    from backend.agent.fraud_detector import analyze_nft_for_fraud, initialize_fraud_detector, close_fraud_detector, NFTData
+    from backend.agent.chat_bot import get_nft_market_analysis, stream_nft_market_analysis, CHAT_ENABLED, CHAT_DISABLED_REASON
     from backend.api.marketplace import router as marketplace_router
     from backend.api.nft import router as nft_router
     from backend.api.listings import router as listings_router
@@ -51,11 +60,18 @@ except ImportError:
     from backend.api.price_prediction import router as price_prediction_router
     from backend.database.connection import create_tables
 
-# Configure logging
+# Configure logging: request code only enqueues records, and a listener thread
+# does the (blocking) stream I/O off the event loop
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(_log_queue, _log_handler, respect_handler_level=True)
 logging.basicConfig(
     level=getattr(logging, settings.log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+log_listener.start()
+atexit.register(log_listener.stop)  # Flush queued records on interpreter exit
 logger = logging.getLogger(__name__)
 
 
@@ -97,9 +113,15 @@ async def lifespan(app):
 
     logger.info("Starting FraudGuard backend...")
 
+    # Sized for the blocking DB/HTTP work handed off via asyncio.to_thread
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=16))
+
     # Create database tables
     create_tables()
 
+    # Start batched transaction history writer
+    transaction_history_writer.start()
+
     # Initialize Supabase client
     logger.info("Initializing Supabase client...")
     await supabase_client.initialize()
@@ -131,6 +153,9 @@ async def lifespan(app):
     if listing_sync_task:
         listing_sync_task.cancel()
     await stop_fraud_detection_service()
+    # Flush queued transaction history rows before exit
+    await transaction_history_writer.stop()
+    await close_fraud_detector()
 
 # Create FastAPI app
 if FastAPI:
@@ -196,9 +221,9 @@ if app:
     async def chat_with_bot(request: ChatRequest):
         """Chat with the NFT market analysis bot"""
         try:
-            # Validate environment first
-            is_valid, error_msg = validate_environment()
-            if not is_valid:
+            # Environment is validated once when chat_bot is imported
+            if not CHAT_ENABLED:
+                error_msg = CHAT_DISABLED_REASON
                 logger.warning(f"Chat bot environment validation failed: {error_msg}")
                 return ChatResponse(
                     query=request.message,
@@ -209,7 +234,7 @@ if app:
                 )
 
             # Get market analysis
-            result = get_nft_market_analysis(request.message)
+            result = await get_nft_market_analysis(request.message)
 
             return ChatResponse(
                 query=result["query"],
@@ -227,6 +252,31 @@ if app:
                 error=str(e)
             )
 
+    @app.post("/api/chat/stream")
+    async def chat_with_bot_stream(request: ChatRequest):
+        """
+        Streaming chat endpoint (NDJSON).
+        The first line carries query/images/data_source, each following line a
+        {"delta": "..."} summary chunk, and the last line {"done": true}.
+        """
+        if not CHAT_ENABLED:
+            logger.warning(f"Chat bot environment validation failed: {CHAT_DISABLED_REASON}")
+            raise HTTPException(status_code=503, detail=CHAT_DISABLED_REASON)
+
+        async def event_stream():
+            try:
+                async for item in stream_nft_market_analysis(request.message):
+                    if isinstance(item, dict):
+                        yield json.dumps({**item, "success": True}) + "\n"
+                    else:
+                        yield json.dumps({"delta": item}) + "\n"
+                yield json.dumps({"done": True}) + "\n"
+            except Exception as e:
+                logger.error(f"Chat bot stream error: {e}")
+                yield json.dumps({"success": False, "error": str(e), "done": True}) + "\n"
+
+        return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 
 # Development server
 if __name__ == "__main__":
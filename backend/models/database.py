@@ -4,11 +4,14 @@ Central location for all SQLAlchemy model definitions
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Boolean, Integer, DateTime, ForeignKey, Float, Numeric
+from typing import Optional, Tuple
+import numpy as np
+from sqlalchemy import Column, String, Text, Boolean, Integer, DateTime, ForeignKey, Float, Numeric, Index, LargeBinary, event, text
 from sqlalchemy.types import DECIMAL
 from sqlalchemy.dialects.postgresql import UUID, JSON, JSONB
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.mutable import MutableDict
+from sqlalchemy.orm import Session, relationship
 
 # Import pgvector for vector support
 try:
@@ -36,6 +39,17 @@ class User(Base):
 
 class NFT(Base):
     __tablename__ = "nfts"
+    __table_args__ = (
+        # Embeddings are stored unit-normalized, so inner product is cosine
+        # similarity and the HNSW index serves ORDER BY embedding_vector <#> :q
+        Index(
+            "ix_nfts_embedding_hnsw_ip",
+            "embedding_vector",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_vector": "vector_ip_ops"}
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     sui_object_id = Column(Text, unique=True, nullable=True)  # Changed to nullable=True - set after minting
@@ -50,9 +64,19 @@ class NFT(Base):
     initial_price = Column(Numeric, nullable=True)
     is_listed = Column(Boolean, default=False, nullable=False)
     embedding_vector = Column(Vector(768), nullable=True)  # pgvector vector type for embeddings
+    embedding_int8 = Column(LargeBinary, nullable=True)  # int8-quantized embedding_vector, kept in sync on set
+    embedding_scale = Column(Float, nullable=True)  # Dequantization scale for embedding_int8
     analysis_details = Column(JSONB, nullable=True)  # JSONB type for analysis details
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
+
+    # Active listings only; read-only so writes still go through Listing directly
+    active_listings = relationship(
+        "Listing",
+        primaryjoin="and_(NFT.id == Listing.nft_id, Listing.status == 'active')",
+        viewonly=True,
+        lazy="select"
+    )
     
     @classmethod
     def find_similar_nfts(cls, db: Session, target_embedding, similarity_threshold: float = 0.8, limit_count: int = 10):
@@ -99,15 +123,56 @@ class NFT(Base):
         
         return cls.find_similar_nfts(db, target_nft.embedding_vector, similarity_threshold, limit_count)
 
+def quantize_embedding(embedding) -> Tuple[Optional[bytes], Optional[float]]:
+    """
+    Symmetric per-vector int8 quantization: q = round(v / scale * 127), scale = max(|v|).
+    Returns (int8 bytes, scale), or (None, None) for a missing embedding.
+    """
+    if embedding is None:
+        return None, None
+    vector = np.asarray(embedding, dtype=np.float32)
+    if not vector.size:
+        return None, None
+    scale = float(np.abs(vector).max()) or 1.0
+    codes = np.clip(np.round(vector / scale * 127), -128, 127).astype(np.int8)
+    return codes.tobytes(), scale
+
+
+def dequantize_embedding(codes: bytes, scale: float) -> np.ndarray:
+    """Approximate float32 embedding from quantize_embedding output"""
+    return np.frombuffer(codes, dtype=np.int8).astype(np.float32) * (scale / 127)
+
+
+@event.listens_for(NFT.embedding_vector, "set")
+def _sync_quantized_embedding(target, value, oldvalue, initiator):
+    """Keep embedding_int8/embedding_scale in step with every embedding_vector write"""
+    target.embedding_int8, target.embedding_scale = quantize_embedding(value)
+
+
 class Listing(Base):
     __tablename__ = "listings"
+    __table_args__ = (
+        # At most one active listing per NFT; partial index keeps the hot
+        # (nft_id, status='active') lookup a point probe over active rows only
+        Index(
+            "ix_listings_active_nft",
+            "nft_id",
+            unique=True,
+            postgresql_where=text("status = 'active'")
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nft_id = Column(UUID(as_uuid=True), ForeignKey("nfts.id"), nullable=True)
     seller_wallet_address = Column(Text, nullable=False)
     price = Column(Numeric, nullable=False)
     status = Column(Text, default="active")
-    listing_metadata = Column(JSONB, nullable=True)
+    listing_metadata = Column(
+        MutableDict.as_mutable(JSONB),  # MutableDict tracks in-place edits
+        nullable=False,
+        default=dict,
+        server_default=text("'{}'::jsonb")
+    )
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime, nullable=True)